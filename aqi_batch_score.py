@@ -0,0 +1,212 @@
+"""
+AirSight batch scoring - score date files offline for backfills and reports
+
+Reads dates (plus optional real feature columns such as ``daily_avg_temp`` or
+``aqi_lag_1``) from CSV or Parquet in fixed-size chunks, scores every chunk
+with all requested models through ``AQIPredictionSystem.score_dates`` and
+appends the results to a Parquet (or CSV) file. Chunks are fanned out to a
+process pool whose workers each load the models once; at most two chunks per
+worker are in flight, so memory stays flat however large the input is.
+
+    python aqi_batch_score.py dates.csv scores.parquet --models all --workers 4
+
+Parquet input/output needs pyarrow (``pip install pyarrow``).
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aqi_prediction_system import AQIPredictionSystem, EXACT_FEATURE_COLUMNS, configure_logging, default_model_path
+
+DEFAULT_CHUNK_ROWS = int(os.environ.get('AQI_BATCH_CHUNK_ROWS', '50000'))
+
+# Columns the input may carry to replace generated features
+OVERRIDE_COLUMNS = [col for col in EXACT_FEATURE_COLUMNS
+                    if col not in ('year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend')]
+
+_worker_system = None
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def _require_pyarrow(path):
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit(f"❌ {path}: Parquet support needs pyarrow (pip install pyarrow)")
+
+
+def iter_input_chunks(path, date_column='date', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """📥 YIELD DataFrames OF AT MOST ``chunk_rows`` ROWS (date + known feature columns)"""
+    if _is_parquet(path):
+        _require_pyarrow(path)
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        names = set(parquet_file.schema_arrow.names)
+        if date_column not in names:
+            raise SystemExit(f"❌ {path} has no '{date_column}' column")
+        columns = [date_column] + [col for col in OVERRIDE_COLUMNS if col in names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    if date_column not in header:
+        raise SystemExit(f"❌ {path} has no '{date_column}' column")
+    columns = [date_column] + [col for col in OVERRIDE_COLUMNS if col in header]
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def _init_worker(model_path, model_names):
+    global _worker_system
+    configure_logging()
+    _worker_system = AQIPredictionSystem()
+    _worker_system.load_models(model_path, precompute_years=0)
+
+
+def score_chunk(dates, overrides, model_names):
+    """Score one chunk in the current process: (dates, {model_key: nullable Int16 AQI}).
+
+    Rows whose date did not parse (NaT) are not scored and get a null AQI.
+    """
+    valid = ~np.isnat(dates)
+    scores = _worker_system.score_dates(dates[valid], model_names,
+                                        {col: values[valid] for col, values in overrides.items()})
+    for model_key, aqis in scores.items():
+        column = pd.array(np.zeros(len(dates), dtype=np.int16), dtype='Int16')
+        column[valid] = aqis
+        column[~valid] = pd.NA
+        scores[model_key] = column
+    return dates, scores
+
+
+class _ResultWriter:
+    """📤 APPEND SCORED CHUNKS TO ONE PARQUET OR CSV FILE"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._wrote_csv_header = False
+        if _is_parquet(path):
+            _require_pyarrow(path)
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._wrote_csv_header else 'w',
+                         header=not self._wrote_csv_header, index=False)
+            self._wrote_csv_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _chunk_payload(chunk, date_column):
+    # Unparseable dates become NaT and are written with a null AQI
+    dates = pd.to_datetime(chunk[date_column], errors='coerce').to_numpy(dtype='datetime64[D]')
+    overrides = {col: pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+                 for col in OVERRIDE_COLUMNS if col in chunk.columns}
+    return dates, overrides
+
+
+def _result_frame(dates, scores):
+    frame = pd.DataFrame({'date': dates})
+    for model_key, aqis in scores.items():
+        frame[f'aqi_{model_key}'] = aqis
+    return frame
+
+
+def run(input_path, output_path, model_path=None, model_names=None, workers=1,
+        chunk_rows=DEFAULT_CHUNK_ROWS, date_column='date'):
+    """🏭 SCORE ``input_path`` INTO ``output_path``; RETURNS {'rows', 'seconds', 'rows_per_second'}"""
+    model_path = model_path or default_model_path()
+    writer = _ResultWriter(output_path)
+    rows = 0
+    started = time.perf_counter()
+    try:
+        if workers <= 1:
+            _init_worker(model_path, model_names)
+            for chunk in iter_input_chunks(input_path, date_column, chunk_rows):
+                dates, scores = score_chunk(*_chunk_payload(chunk, date_column), model_names)
+                writer.write(_result_frame(dates, scores))
+                rows += len(dates)
+                _report_progress(rows, started)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, model_names)) as pool:
+                # Bounded in-flight window keeps memory flat; results are written in input order
+                pending = deque()
+                for chunk in iter_input_chunks(input_path, date_column, chunk_rows):
+                    pending.append(pool.submit(score_chunk, *_chunk_payload(chunk, date_column), model_names))
+                    while len(pending) >= 2 * workers:
+                        rows += _write_result(writer, pending.popleft())
+                        _report_progress(rows, started)
+                while pending:
+                    rows += _write_result(writer, pending.popleft())
+                    _report_progress(rows, started)
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    return {'rows': rows, 'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None}
+
+
+def _write_result(writer, future):
+    dates, scores = future.result()
+    writer.write(_result_frame(dates, scores))
+    return len(dates)
+
+
+def _report_progress(rows, started):
+    elapsed = time.perf_counter() - started
+    print(f"   {rows:,} rows scored ({rows / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score dates from CSV/Parquet with the AQI models.")
+    parser.add_argument('input', help='CSV or Parquet file with a date column')
+    parser.add_argument('output', help='Parquet (.parquet) or CSV file to write')
+    parser.add_argument('--models', default='all',
+                        help='comma-separated model names (gbr,rf,et,xgboost) or "all"')
+    parser.add_argument('--model-path', default=None, help='model pickle or artifact dir (default: AQI_MODEL_PATH)')
+    parser.add_argument('--workers', type=int, default=1, help='scoring processes (1 = in-process)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows per chunk')
+    parser.add_argument('--date-column', default='date')
+    args = parser.parse_args(argv)
+
+    # Quiet model-loading chatter here and in spawned workers
+    os.environ.setdefault('AQI_LOG_LEVEL', 'WARNING')
+    configure_logging()
+    model_path = args.model_path or default_model_path()
+    if not os.path.exists(model_path):
+        sys.exit(f"❌ No trained models at {model_path}; pass --model-path or set AQI_MODEL_PATH")
+    model_names = None if args.models == 'all' else [m.strip() for m in args.models.split(',') if m.strip()]
+    try:
+        result = run(args.input, args.output, model_path, model_names,
+                     args.workers, args.chunk_rows, args.date_column)
+    except RuntimeError as e:
+        sys.exit(f"❌ Batch scoring failed: {e}")
+    print(f"✅ Scored {result['rows']:,} rows in {result['seconds']}s "
+          f"({result['rows_per_second']:,} rows/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
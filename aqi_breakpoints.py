@@ -0,0 +1,143 @@
+"""
+AirSight breakpoint engine - vectorized EPA sub-index arithmetic
+
+``BreakpointEngine`` turns the EPA breakpoint tables of AQIPredictionSystem
+(``{pollutant: [(c_lo, c_hi, i_lo, i_hi), ...]}``) into sorted NumPy arrays.
+Each reading is truncated to the EPA reporting precision, its segment is found
+with ``np.searchsorted`` on the upper concentration bounds and the sub-index is
+the piecewise-linear interpolation
+
+    I = (i_hi - i_lo) / (c_hi - c_lo) * (C - c_lo) + i_lo
+
+The AQI is the maximum sub-index and the dominant pollutant its argmax. The
+inverse (sub-index -> concentration) is used to build concentrations that are
+consistent with a predicted AQI.
+"""
+
+import numpy as np
+
+# Decimal places EPA keeps before looking up a breakpoint
+EPA_TRUNCATION = {'PM2.5': 1, 'PM10': 0, 'CO': 1, 'SO2': 0, 'NO2': 0, 'O3': 3}
+
+# Dashboard concentration keys -> (breakpoint pollutant, factor to breakpoint units).
+# NO2/SO2 are carried in ppm and their breakpoints are in ppb.
+CONCENTRATION_POLLUTANTS = {
+    'PM2.5 - Local Conditions': ('PM2.5', 1.0),
+    'PM10 Total 0-10um STP': ('PM10', 1.0),
+    'Carbon monoxide': ('CO', 1.0),
+    'Nitrogen dioxide (NO2)': ('NO2', 1000.0),
+    'Sulfur dioxide': ('SO2', 1000.0),
+    'Ozone': ('O3', 1.0)
+}
+
+
+class BreakpointTable:
+    """📐 ONE POLLUTANT'S BREAKPOINTS AS SORTED ARRAYS"""
+
+    def __init__(self, pollutant, rows, decimals=None):
+        rows = np.array(sorted(rows), dtype=np.float64)
+        if rows.ndim != 2 or rows.shape[1] != 4:
+            raise ValueError(f"{pollutant} breakpoints must be (c_lo, c_hi, i_lo, i_hi) rows")
+        self.pollutant = pollutant
+        self.c_lo, self.c_hi, self.i_lo, self.i_hi = (np.ascontiguousarray(col) for col in rows.T)
+        if np.any(np.diff(self.c_hi) <= 0) or np.any(np.diff(self.i_hi) <= 0):
+            raise ValueError(f"{pollutant} breakpoints are not increasing")
+        self.slope = (self.i_hi - self.i_lo) / (self.c_hi - self.c_lo)
+        self.decimals = decimals
+        self._scale = None if decimals is None else 10.0 ** decimals
+
+    def truncate(self, concentrations):
+        c = np.maximum(np.asarray(concentrations, dtype=np.float64), 0.0)
+        if self._scale is None:
+            return c
+        # The small epsilon keeps 12.1 from truncating to 12.0 after float error
+        return np.floor(c * self._scale + 1e-9) / self._scale
+
+    def sub_index(self, concentrations):
+        """Sub-index per reading; readings above the table extrapolate the top segment."""
+        c = self.truncate(concentrations)
+        segment = np.minimum(np.searchsorted(self.c_hi, c, side='left'), len(self.c_hi) - 1)
+        return self.i_lo[segment] + self.slope[segment] * (c - self.c_lo[segment])
+
+    def concentration(self, sub_indices):
+        """Inverse of ``sub_index``: the concentration that yields each sub-index."""
+        i = np.maximum(np.asarray(sub_indices, dtype=np.float64), 0.0)
+        segment = np.minimum(np.searchsorted(self.i_hi, i, side='left'), len(self.i_hi) - 1)
+        # Sub-indices in the gap between segments (e.g. 50.5) map to that segment's c_lo
+        i = np.maximum(i, np.where(segment > 0, self.i_lo[segment], i))
+        return self.c_lo[segment] + (i - self.i_lo[segment]) / self.slope[segment]
+
+
+class BreakpointEngine:
+    """🧮 VECTORIZED EPA SUB-INDICES, AQI AND DOMINANT POLLUTANT"""
+
+    def __init__(self, breakpoints, truncation=EPA_TRUNCATION):
+        self.tables = {
+            pollutant: BreakpointTable(pollutant, rows, truncation.get(pollutant))
+            for pollutant, rows in breakpoints.items()
+        }
+
+    @property
+    def pollutants(self):
+        return list(self.tables)
+
+    def sub_index(self, pollutant, concentrations):
+        return self.tables[pollutant].sub_index(concentrations)
+
+    def concentration(self, pollutant, sub_indices):
+        return self.tables[pollutant].concentration(sub_indices)
+
+    def sub_indices(self, concentrations):
+        """{pollutant: sub-index array} for {pollutant: concentration array}."""
+        return {pollutant: self.sub_index(pollutant, values) for pollutant, values in concentrations.items()}
+
+    def evaluate(self, concentrations):
+        """(sub_indices, aqi, dominant) for equally long concentration arrays.
+
+        ``aqi`` is the maximum sub-index per reading (NaN readings are ignored)
+        and ``dominant`` the name of the pollutant that sets it.
+        """
+        names = list(concentrations)
+        if not names:
+            raise ValueError("No concentrations to evaluate")
+        sub_indices = self.sub_indices(concentrations)
+        stacked = np.vstack([np.atleast_1d(sub_indices[name]) for name in names])
+        ranked = np.where(np.isnan(stacked), -np.inf, stacked)
+        winner = np.argmax(ranked, axis=0)
+        aqi = ranked[winner, np.arange(stacked.shape[1])]
+        aqi = np.where(np.isinf(aqi), np.nan, aqi)
+        return sub_indices, aqi, np.asarray(names, dtype=object)[winner]
+
+    def concentration_sub_indices(self, concentrations):
+        """{dashboard key: sub-index} for a dashboard concentration dict (see CONCENTRATION_POLLUTANTS)."""
+        out = {}
+        for key, value in concentrations.items():
+            if key in CONCENTRATION_POLLUTANTS:
+                pollutant, factor = CONCENTRATION_POLLUTANTS[key]
+                if pollutant in self.tables:
+                    out[key] = float(self.sub_index(pollutant, value * factor))
+        return out
+
+    def dominant_concentration(self, concentrations):
+        """Dashboard key of the pollutant with the highest sub-index."""
+        sub_indices = self.concentration_sub_indices(concentrations)
+        if not sub_indices:
+            return None
+        return max(sub_indices, key=sub_indices.get)
+
+    def scale_concentrations_to_aqi(self, concentrations, aqi):
+        """Rescale sub-indices so the dominant one equals ``aqi``, then map back to concentrations.
+
+        Keeps the relative pollutant mix of ``concentrations`` while making the
+        dict consistent with the predicted AQI. Keys without breakpoints pass through.
+        """
+        sub_indices = self.concentration_sub_indices(concentrations)
+        peak = max(sub_indices.values(), default=0.0)
+        if peak <= 0 or aqi is None:
+            return dict(concentrations)
+        ratio = float(aqi) / peak
+        scaled = dict(concentrations)
+        for key, sub_index in sub_indices.items():
+            pollutant, factor = CONCENTRATION_POLLUTANTS[key]
+            scaled[key] = float(self.concentration(pollutant, sub_index * ratio)) / factor
+        return scaled
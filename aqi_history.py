@@ -0,0 +1,275 @@
+"""
+AirSight AQI history store - observed/predicted daily AQI with real lag features
+
+The models were trained on real lag features (aqi_lag_1/3/7, aqi_ma_3/7,
+aqi_trend_3, aqi_volatility). AQIHistoryStore keeps an append-only daily AQI
+series and maintains those seven features incrementally: each appended day
+updates running sums in O(1) and stores the feature row for the following day.
+The series persists as a small .npz file (start date + float64 values).
+
+Build the file from observed readings (one or more rows per day; days are
+averaged and gaps of up to --max-gap days interpolated):
+
+    python aqi_history.py observed.csv aqi_history.npz --date-column date --aqi-column aqi
+
+Point AQI_HISTORY_PATH at it. Running servers then take further days through
+POST /api/admin/observed-aqi and pick up a rewritten file on their own; see
+AQIPredictionSystem.sync_history.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Order matches the lag columns of EXACT_FEATURE_COLUMNS
+LAG_FEATURE_COLUMNS = [
+    'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7',
+    'aqi_ma_3', 'aqi_ma_7', 'aqi_trend_3', 'aqi_volatility'
+]
+
+LAG_WINDOW_DAYS = 7
+
+# Longest run of missing days from_observations() fills by interpolation
+MAX_FILL_GAP_DAYS = 3
+
+
+class RollingAQIWindow:
+    """🔁 LAST 7 DAILY AQI VALUES WITH RUNNING SUMS FOR O(1) LAG FEATURES"""
+
+    def __init__(self, values=()):
+        self._values = deque(maxlen=LAG_WINDOW_DAYS)
+        self._sum_3 = 0.0
+        self._sum_7 = 0.0
+        self._sumsq_7 = 0.0
+        for value in values:
+            self.push(value)
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def ready(self):
+        return len(self._values) == LAG_WINDOW_DAYS
+
+    def push(self, aqi):
+        aqi = float(aqi)
+        values = self._values
+        if len(values) >= 3:
+            self._sum_3 -= values[-3]
+        if len(values) == LAG_WINDOW_DAYS:
+            oldest = values[0]
+            self._sum_7 -= oldest
+            self._sumsq_7 -= oldest * oldest
+        values.append(aqi)
+        self._sum_3 += aqi
+        self._sum_7 += aqi
+        self._sumsq_7 += aqi * aqi
+
+    def features(self):
+        """Lag features for the day after the newest value (LAG_FEATURE_COLUMNS order)."""
+        if not self.ready:
+            return None
+        values = self._values
+        n = LAG_WINDOW_DAYS
+        mean_7 = self._sum_7 / n
+        variance = max(0.0, (self._sumsq_7 - n * mean_7 * mean_7) / (n - 1))
+        return np.array([
+            values[-1],
+            values[-3],
+            values[-7],
+            self._sum_3 / 3,
+            mean_7,
+            values[-1] - values[-4],
+            np.sqrt(variance)
+        ], dtype=np.float64)
+
+
+class AQIHistoryStore:
+    """📚 APPEND-ONLY DAILY AQI SERIES WITH INCREMENTAL LAG FEATURES
+
+    ``values[i]`` is the AQI for ``start + i`` days and ``lag_rows[i]`` the
+    lag features for predicting that day (NaN until 7 prior days exist).
+    ``lag_rows`` has one extra row: the features for the day after ``end``.
+    """
+
+    def __init__(self):
+        self.start = None
+        self._values = np.empty(0, dtype=np.float64)
+        self._lag_rows = np.full((1, len(LAG_FEATURE_COLUMNS)), np.nan)
+        self._size = 0
+        self._window = RollingAQIWindow()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def end(self):
+        if self.start is None:
+            return None
+        return self.start + np.timedelta64(self._size - 1, 'D')
+
+    @property
+    def values(self):
+        return self._values[:self._size]
+
+    def _grow(self, needed):
+        capacity = len(self._values)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        values = np.empty(capacity, dtype=np.float64)
+        values[:self._size] = self._values[:self._size]
+        lag_rows = np.full((capacity + 1, len(LAG_FEATURE_COLUMNS)), np.nan)
+        lag_rows[:self._size + 1] = self._lag_rows[:self._size + 1]
+        self._values, self._lag_rows = values, lag_rows
+
+    def append(self, date, aqi):
+        """Add the AQI for the day after ``end`` (or the first day of an empty store)."""
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        if self.start is None:
+            self.start = day
+        elif day != self.end + np.timedelta64(1, 'D'):
+            raise ValueError(f"History is append-only: expected {self.end + np.timedelta64(1, 'D')}, got {day}")
+
+        self._grow(self._size + 1)
+        self._values[self._size] = float(aqi)
+        self._window.push(aqi)
+        self._size += 1
+        features = self._window.features()
+        if features is not None:
+            self._lag_rows[self._size] = features
+
+    def extend(self, start, values):
+        day = pd.Timestamp(start)
+        for offset, aqi in enumerate(values):
+            self.append(day + pd.Timedelta(days=offset), aqi)
+
+    def positions(self, index):
+        """Offset of each date in a DatetimeIndex from ``start`` (None if empty)."""
+        if self.start is None:
+            return None
+        return (index.normalize().to_numpy().astype('datetime64[D]') - self.start).astype(np.int64)
+
+    def features_for(self, index):
+        """(N, 7) lag features for a DatetimeIndex; rows are NaN where history is too short."""
+        out = np.full((len(index), len(LAG_FEATURE_COLUMNS)), np.nan)
+        days = self.positions(index)
+        if days is None:
+            return out
+        valid = (days >= LAG_WINDOW_DAYS) & (days <= self._size)
+        out[valid] = self._lag_rows[days[valid]]
+        return out
+
+    def value_on(self, date):
+        if self.start is None:
+            return None
+        day = (np.datetime64(pd.Timestamp(date).date(), 'D') - self.start).astype(np.int64)
+        if 0 <= day < self._size:
+            return float(self._values[day])
+        return None
+
+    def window_before(self, date):
+        """RollingAQIWindow over the 7 days before ``date``, or None if not all recorded."""
+        if self.start is None:
+            return None
+        day = (np.datetime64(pd.Timestamp(date).date(), 'D') - self.start).astype(np.int64)
+        if day < LAG_WINDOW_DAYS or day > self._size:
+            return None
+        return RollingAQIWindow(self._values[day - LAG_WINDOW_DAYS:day])
+
+    def save(self, path):
+        """Write to a temp file beside ``path`` and rename it over, so readers never see half a file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, start=np.array(str(self.start) if self.start is not None else ''), values=self.values)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with np.load(path) as data:
+            start = str(data['start'])
+            if start:
+                store.extend(datetime.strptime(start, '%Y-%m-%d'), data['values'])
+        return store
+
+    @classmethod
+    def from_observations(cls, dates, aqi, max_gap_days=MAX_FILL_GAP_DAYS):
+        """Daily series from raw readings: per-day mean, short gaps interpolated.
+
+        A gap longer than ``max_gap_days`` cannot be bridged honestly, so only
+        the readings after the last such gap are kept.
+        """
+        readings = pd.Series(np.asarray(aqi, dtype=np.float64),
+                             index=pd.DatetimeIndex(pd.to_datetime(dates)).normalize())
+        daily = readings[np.isfinite(readings.to_numpy())].groupby(level=0).mean().sort_index()
+        store = cls()
+        if daily.empty:
+            return store
+        daily = daily.reindex(pd.date_range(daily.index[0], daily.index[-1], freq='D'))
+        missing = daily.isna().to_numpy()
+        run_ids = np.cumsum(~missing)
+        run_lengths = np.bincount(run_ids[missing], minlength=run_ids[-1] + 1)
+        long_gaps = np.flatnonzero(missing & (run_lengths[run_ids] > max_gap_days))
+        if len(long_gaps):
+            daily = daily.iloc[long_gaps[-1] + 1:]
+        store.extend(daily.index[0], daily.interpolate(limit_area='inside').to_numpy())
+        return store
+
+    def describe(self):
+        return {
+            'start': str(self.start) if self.start is not None else None,
+            'end': str(self.end) if self.start is not None else None,
+            'days': self._size
+        }
+
+
+def _find_column(columns, name):
+    for column in columns:
+        if column.lower() == name.lower():
+            return column
+    raise KeyError(f"No '{name}' column (have: {', '.join(map(str, columns))})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the AQI history file from observed readings.")
+    parser.add_argument('input', help='CSV with a date column and an observed AQI column')
+    parser.add_argument('output', help='history file to write (the AQI_HISTORY_PATH of the server)')
+    parser.add_argument('--date-column', default='date')
+    parser.add_argument('--aqi-column', default='aqi')
+    parser.add_argument('--max-gap', type=int, default=MAX_FILL_GAP_DAYS,
+                        help='longest run of missing days to interpolate')
+    args = parser.parse_args(argv)
+
+    frame = pd.read_csv(args.input)
+    try:
+        date_column = _find_column(frame.columns, args.date_column)
+        aqi_column = _find_column(frame.columns, args.aqi_column)
+    except KeyError as e:
+        sys.exit(f"❌ {e.args[0]}")
+    aqi = pd.to_numeric(frame[aqi_column], errors='coerce')
+    store = AQIHistoryStore.from_observations(frame[date_column], aqi, args.max_gap)
+    if not len(store):
+        sys.exit(f"❌ No usable AQI readings in {args.input}")
+    first_reading = pd.to_datetime(frame[date_column][aqi.notna()]).min().normalize()
+    if np.datetime64(first_reading.date(), 'D') < store.start:
+        print(f"⚠️ Dropped readings before {store.start}: a gap of more than {args.max_gap} days precedes it",
+              file=sys.stderr)
+    store.save(args.output)
+    summary = store.describe()
+    print(f"✅ Wrote {summary['days']} days ({summary['start']} to {summary['end']}) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
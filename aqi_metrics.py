@@ -0,0 +1,218 @@
+"""
+AirSight metrics - in-process counters and latency histograms, Prometheus text format
+
+Counters, gauges and fixed-bucket histograms are plain Python objects guarded
+by one lock each; recording a value is a bisect plus a few integer updates,
+so instrumentation can stay on in production. ``REGISTRY.render()`` produces
+the Prometheus text exposition format served by /api/metrics. Values are per
+process: with several gunicorn workers, each scrape sees the worker that
+answered it.
+
+While a request is being profiled, every histogram observation is also kept
+as a span (see ``start_span_capture``) so the profile can show time per
+stage; outside profiling that costs one ContextVar lookup.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond table lookups up to multi-second cold ranges
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Span list of the request being profiled in this context; None = not capturing
+_captured_spans = contextvars.ContextVar('aqi_captured_spans', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """➕ MONOTONIC COUNT PER LABEL SET"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in series]
+
+
+class Gauge(_Metric):
+    """📍 LAST-SET VALUE PER LABEL SET, OR VALUES READ FROM A CALLBACK AT SCRAPE TIME
+
+    ``callback()`` returns ``[(labels_dict, value), ...]``.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def render(self):
+        if self.callback is not None:
+            series = sorted((self._key(labels), value) for labels, value in self.callback())
+        else:
+            with self._lock:
+                series = sorted(self._series.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in series if value is not None]
+
+
+class Histogram(_Metric):
+    """📊 FIXED-BUCKET LATENCY HISTOGRAM PER LABEL SET"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        spans = _captured_spans.get()
+        if spans is not None:
+            spans.append((f"{self.name}{_format_labels(self.labelnames, key)}", value))
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels):
+        """(bucket counts, sum, count) for one label set, or None."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return None if series is None else (list(series[0]), series[1], series[2])
+
+    def render(self):
+        with self._lock:
+            series = sorted((key, (list(v[0]), v[1], v[2])) for key, v in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """🗂️ NAME -> METRIC; render() IS THE /api/metrics BODY"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def start_span_capture():
+    """Start keeping histogram observations made in this context; returns a token for stop_span_capture."""
+    return _captured_spans.set([])
+
+
+def stop_span_capture(token):
+    """🧵 STOP CAPTURING; RETURNS [{'span', 'count', 'total_ms'}] SLOWEST FIRST"""
+    spans = _captured_spans.get() or []
+    _captured_spans.reset(token)
+    totals = {}
+    for span, value in spans:
+        count, total = totals.get(span, (0, 0.0))
+        totals[span] = (count + 1, total + value)
+    return [{'span': span, 'count': count, 'total_ms': round(total * 1000, 3)}
+            for span, (count, total) in sorted(totals.items(), key=lambda item: -item[1][1])]
+
+
+REGISTRY = MetricsRegistry()
+
+# Stages of a prediction request: feature_build, model_predict, pollutant_derivation, chart_generation, ...
+STAGE_SECONDS = REGISTRY.histogram(
+    'aqi_prediction_stage_seconds', 'Time spent per prediction stage.', ['stage'])
+MODEL_PREDICT_SECONDS = REGISTRY.histogram(
+    'aqi_model_predict_seconds', 'Time spent in one batched predict() call per model.', ['model', 'backend'])
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    'aqi_model_load_seconds', 'Duration of the most recent model load.')
+MODEL_LOADS = REGISTRY.counter(
+    'aqi_model_loads_total', 'Model loads by outcome.', ['outcome'])
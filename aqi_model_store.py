@@ -0,0 +1,126 @@
+"""
+AirSight model artifacts - split aqi_4_models.pkl into per-model files
+
+The training pickle bundles every ensemble plus PyCaret metadata, so loading
+it means unpickling all four models in every worker. ``export`` writes one
+joblib file per model and a small manifest.json (feature_columns,
+performances, best_model, source fingerprint). ``LazyModelDict`` then loads a
+model only the first time it is used, so a worker that only serves the best
+model never unpickles the others.
+
+    python aqi_model_store.py aqi_4_models.pkl aqi_4_models/
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections.abc import Mapping
+
+import joblib
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+
+
+def is_artifact_dir(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError(f"Unsupported model manifest format: {manifest.get('format')}")
+    return manifest
+
+
+def export(pickle_path, directory):
+    """📦 WRITE ONE .joblib PER MODEL + manifest.json FROM THE TRAINING PICKLE"""
+    with open(pickle_path, 'rb') as f:
+        raw = f.read()
+    data = pickle.loads(raw)
+    if not isinstance(data, dict) or 'models' not in data:
+        raise ValueError(f"{pickle_path} has no 'models' dictionary to export")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'source': os.path.basename(pickle_path),
+        'source_fingerprint': hashlib.sha256(raw).hexdigest(),
+        'best_model': data.get('best_model'),
+        'feature_columns': list(data.get('feature_columns') or []),
+        'training_info': data.get('training_info', {}),
+        'models': {}
+    }
+    del raw
+
+    for model_key, model_info in data['models'].items():
+        model = model_info.get('model') if isinstance(model_info, dict) else None
+        if not hasattr(model, 'predict'):
+            continue
+        filename = f"{model_key}.joblib"
+        joblib.dump(model, os.path.join(directory, filename))
+        manifest['models'][model_key] = {
+            'file': filename,
+            'type': type(model).__name__,
+            'performance': model_info.get('performance', {}),
+            'used_tuning': model_info.get('used_tuning')
+        }
+
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+class LazyModelDict(Mapping):
+    """🦥 {model_key: model} THAT LOADS EACH joblib FILE ON FIRST ACCESS
+
+    ``on_load(key, model)`` is called once per model after it is loaded,
+    outside the load lock, so it may itself read other models from the dict.
+    """
+
+    def __init__(self, directory, manifest, on_load=None):
+        self.directory = directory
+        self.files = {key: info['file'] for key, info in manifest['models'].items()}
+        self.on_load = on_load
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        model = self._loaded.get(key)
+        if model is not None:
+            return model
+        if key not in self.files:
+            raise KeyError(key)
+        with self._lock:
+            model = self._loaded.get(key)
+            if model is not None:
+                return model
+            model = joblib.load(os.path.join(self.directory, self.files[key]))
+            self._loaded[key] = model
+        if self.on_load is not None:
+            self.on_load(key, model)
+        return model
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, key):
+        return key in self.files
+
+    def loaded_keys(self):
+        return list(self._loaded)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(f"usage: python {os.path.basename(sys.argv[0])} <aqi_4_models.pkl> <output_dir>")
+        sys.exit(2)
+    result = export(sys.argv[1], sys.argv[2])
+    print(f"✅ Exported {len(result['models'])} models to {sys.argv[2]}: {list(result['models'])}")
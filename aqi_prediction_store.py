@@ -0,0 +1,236 @@
+"""
+AirSight prediction store - persistent (version, model, date) -> AQI / concentrations
+
+An optional SQLite database (WAL mode) behind the in-process PredictionCache.
+Every gunicorn worker opens the same file: WAL lets them all read while one
+writes, so a prediction made by any worker - or before the last restart - is
+served from disk by all of them. Writes are queued and committed in batches
+by a background thread per process, so requests never wait on the disk.
+
+``version`` is the model-file fingerprint. An AQI row is also keyed on
+``lags``, a digest of the observed-history lag features that day was scored
+with ('' when they were generated), so appending an observation only misses
+the days whose lag window it covers. Concentrations are keyed on the AQI
+they are scaled to. Rows of other versions are never read again;
+``prune_other_versions`` deletes them in the background.
+
+    AQI_PREDICTION_STORE=/var/lib/airsight/predictions.sqlite gunicorn -c gunicorn.conf.py
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+# Shares the prediction system's logger (handler and AQI_LOG_LEVEL)
+logger = logging.getLogger('aqi_prediction_system')
+
+# SQLite file shared by all workers; empty disables the store
+STORE_PATH = os.environ.get('AQI_PREDICTION_STORE', '')
+# Rows committed per write transaction
+WRITE_BATCH_ROWS = 2048
+# Pending writes kept before new ones are dropped (the store is only a cache)
+WRITE_QUEUE_SIZE = 100000
+# SQLite caps bound parameters per statement; dates are looked up in chunks
+_LOOKUP_CHUNK = 500
+
+# Bumped whenever the tables change shape; older files are emptied and recreated
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+DROP TABLE IF EXISTS aqi;
+DROP TABLE IF EXISTS concentrations;
+CREATE TABLE aqi (
+    version TEXT NOT NULL, model TEXT NOT NULL, date TEXT NOT NULL, lags TEXT NOT NULL, aqi INTEGER NOT NULL,
+    PRIMARY KEY (version, model, date, lags)) WITHOUT ROWID;
+CREATE TABLE concentrations (
+    version TEXT NOT NULL, model TEXT NOT NULL, date TEXT NOT NULL, aqi REAL NOT NULL, payload TEXT NOT NULL,
+    PRIMARY KEY (version, model, date, aqi)) WITHOUT ROWID;
+"""
+
+_INSERTS = {
+    'aqi': "INSERT OR IGNORE INTO aqi (version, model, date, lags, aqi) VALUES (?, ?, ?, ?, ?)",
+    'concentrations': "INSERT OR IGNORE INTO concentrations (version, model, date, aqi, payload) VALUES (?, ?, ?, ?, ?)",
+}
+
+
+class PredictionStore:
+    """💾 SQLITE-BACKED PREDICTION STORE SHARED BY WORKERS AND RESTARTS
+
+    Reads use one connection per thread; writes go through a queue to a
+    single writer thread. Both are recreated after a fork, so an instance
+    built in the gunicorn master works in every worker.
+    """
+
+    def __init__(self, path, queue_size=WRITE_QUEUE_SIZE):
+        self.path = path
+        self.queue_size = queue_size
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._writer_pid = None
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._schema_ready:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for statement in filter(str.strip, _SCHEMA.split(';')):
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+            self._schema_ready = True
+        return conn
+
+    def _reader(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = self._connect()
+            local.pid = os.getpid()
+        return local.conn
+
+    # ---------------- Reads ----------------
+    def get_aqis(self, version, model, keys):
+        """{date: aqi} for the ``keys`` ((date 'YYYY-MM-DD', lags) pairs) already stored."""
+        wanted = dict(keys)
+        found = {}
+        try:
+            conn = self._reader()
+            dates = list(wanted)
+            for lo in range(0, len(dates), _LOOKUP_CHUNK):
+                chunk = dates[lo:lo + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f"SELECT date, lags, aqi FROM aqi WHERE version = ? AND model = ? "
+                    f"AND date IN ({','.join('?' * len(chunk))})", [version, model, *chunk]).fetchall()
+                found.update((date, aqi) for date, lags, aqi in rows if wanted[date] == lags)
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Prediction store read failed: %s", e)
+        self.hits += len(found)
+        self.misses += len(wanted) - len(found)
+        return found
+
+    def get_aqi(self, version, model, date, lags):
+        return self.get_aqis(version, model, [(date, lags)]).get(date)
+
+    def get_concentrations(self, version, model, date, aqi):
+        try:
+            row = self._reader().execute(
+                "SELECT payload FROM concentrations WHERE version = ? AND model = ? AND date = ? AND aqi = ?",
+                (version, model, date, float(aqi))).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Prediction store read failed: %s", e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    # ---------------- Writes ----------------
+    def put_aqis(self, version, model, items):
+        """Queue [(date, lags, aqi), ...] for writing; returns immediately."""
+        rows = [(version, model, date, lags, int(aqi)) for date, lags, aqi in items if aqi is not None]
+        if rows:
+            self._enqueue('aqi', rows)
+
+    def put_concentrations(self, version, model, date, aqi, concentrations):
+        self._enqueue('concentrations', [(version, model, date, float(aqi), json.dumps(concentrations))])
+
+    def _enqueue(self, table, rows):
+        try:
+            self._writer_queue().put_nowait((table, rows))
+        except queue.Full:
+            self.dropped += len(rows)
+
+    def _writer_queue(self):
+        pid = os.getpid()
+        if self._writer_pid != pid:
+            with self._lock:
+                if self._writer_pid != pid:
+                    self._queue = queue.Queue(maxsize=self.queue_size)
+                    threading.Thread(target=self._write_loop, args=(self._queue,),
+                                     name='aqi-prediction-store', daemon=True).start()
+                    self._writer_pid = pid
+        return self._queue
+
+    def _write_loop(self, pending):
+        conn = None
+        while True:
+            batch = [pending.get()]
+            rows = len(batch[0][1])
+            while rows < WRITE_BATCH_ROWS:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+                rows += len(batch[-1][1])
+            rows = sum(len(table_rows) for table, table_rows in batch if table != 'prune')
+            try:
+                if conn is None:
+                    conn = self._connect()
+                conn.execute('BEGIN IMMEDIATE')
+                for table, table_rows in batch:
+                    if table == 'prune':
+                        self.pruned += self._delete_other_versions(conn, table_rows)
+                    else:
+                        conn.executemany(_INSERTS[table], table_rows)
+                conn.execute('COMMIT')
+                self.written += rows
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Prediction store write failed (%d rows dropped): %s", rows, e)
+                self.dropped += rows
+                if conn is not None and conn.in_transaction:
+                    conn.execute('ROLLBACK')
+            finally:
+                for _ in batch:
+                    pending.task_done()
+
+    def flush(self):
+        """Block until every queued write of this process is committed."""
+        if self._queue is not None and self._writer_pid == os.getpid():
+            self._queue.join()
+
+    # ---------------- Maintenance ----------------
+    @staticmethod
+    def _delete_other_versions(conn, keep):
+        marks = ','.join('?' * len(keep)) or "''"
+        return sum(conn.execute(f"DELETE FROM {table} WHERE version NOT IN ({marks})", keep).rowcount
+                   for table in ('aqi', 'concentrations'))
+
+    def prune(self, keep_versions):
+        """🧹 DELETE ROWS OF EVERY VERSION NOT IN ``keep_versions``; RETURNS ROWS DELETED"""
+        conn = self._connect()
+        try:
+            return self._delete_other_versions(conn, list(keep_versions))
+        finally:
+            conn.close()
+
+    def prune_other_versions(self, version):
+        """🧹 QUEUE DELETION OF EVERY ROW NOT OF ``version`` ON THE WRITER THREAD"""
+        try:
+            self._writer_queue().put_nowait(('prune', [version]))
+        except queue.Full:
+            pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'written': self.written,
+            'dropped': self.dropped,
+            'pruned': self.pruned,
+            'queued': self._queue.qsize() if self._queue is not None and self._writer_pid == os.getpid() else 0
+        }
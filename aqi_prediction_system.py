@@ -1,18 +1,544 @@
 """
 AirSight ML Prediction System - FIXED TO USE REAL MODELS
 Enhanced to properly load and use trained models from aqi_4_models.pkl
+
+Logging goes through the ``aqi_prediction_system`` logger. Model loading is
+reported at INFO; per-prediction tracing is at DEBUG and is off by default.
+Set AQI_LOG_LEVEL=DEBUG to turn it back on (or WARNING to silence startup).
 """
 
 import numpy as np
 import pandas as pd
 import pickle
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import contextlib
 import hashlib
+import logging
+import sys
 import warnings
 import os
+import threading
+import time
+import contextvars
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+import aqi_model_store
+import aqi_prediction_store
+import aqi_tree_engine
+from aqi_history import AQIHistoryStore, LAG_WINDOW_DAYS
+from aqi_breakpoints import BreakpointEngine
+from aqi_metrics import STAGE_SECONDS, MODEL_PREDICT_SECONDS, MODEL_LOAD_SECONDS, MODEL_LOADS
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+
+def resolve_log_level(name, default=logging.INFO):
+    """Numeric level for a name such as 'warning'; unknown names fall back to ``default``."""
+    level = logging.getLevelName(str(name).strip().upper())
+    if isinstance(level, int):
+        return level
+    logger.warning("⚠️ Unknown log level %r, using %s", name, logging.getLevelName(default))
+    return default
+
+
+def configure_logging(level=None):
+    """📣 SEND PREDICTION-SYSTEM LOGS TO STDOUT AT ``level`` (DEFAULT AQI_LOG_LEVEL)
+
+    For entry points (the API, CLIs, pool workers); importing this module
+    never installs handlers. Safe to call more than once.
+    """
+    logger.setLevel(resolve_log_level(level or os.environ.get('AQI_LOG_LEVEL', 'INFO')))
+    if not any(getattr(handler, '_aqi_handler', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler._aqi_handler = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+# Your exact feature columns from training
+EXACT_FEATURE_COLUMNS = [
+    'year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend',
+    'daily_avg_temp', 'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7',
+    'aqi_ma_3', 'aqi_ma_7', 'aqi_trend_3', 'aqi_volatility'
+]
+
+# Seeded noise for aqi_lag_1, aqi_lag_3, aqi_lag_7, aqi_ma_3, aqi_ma_7, aqi_trend_3, aqi_volatility
+LAG_NOISE_LOC = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 8.0])
+LAG_NOISE_SCALE = np.array([5.0, 7.0, 10.0, 3.0, 4.0, 8.0, 3.0])
+
+# Map API model names to your actual trained model names
+MODEL_NAME_MAPPING = {
+    'gbr': 'gbr',
+    'gradient_boosting': 'gbr',
+    'rf': 'rf',
+    'random_forest': 'rf',
+    'et': 'et',
+    'extra_trees': 'et',
+    'xgboost': 'xgboost'
+}
+
+# Years either side of the current one to precompute at load time (0 disables)
+PRECOMPUTE_YEARS = int(os.environ.get('AQI_PRECOMPUTE_YEARS', '1'))
+
+def default_model_path():
+    """📦 AQI_MODEL_PATH, ELSE THE EXPORTED aqi_4_models/ DIRECTORY, ELSE THE PICKLE"""
+    path = os.environ.get('AQI_MODEL_PATH')
+    if path:
+        return path
+    if aqi_model_store.is_artifact_dir('aqi_4_models'):
+        return 'aqi_4_models'
+    return 'aqi_4_models.pkl'
+
+
+# Models served by the pure-NumPy tree engine: comma-separated keys or "all"
+NUMPY_TREE_MODELS = os.environ.get('AQI_NUMPY_TREES', '')
+
+# Observed AQI history used for real lag features (loaded at startup if present)
+HISTORY_PATH = os.environ.get('AQI_HISTORY_PATH', 'aqi_history.npz')
+
+# Seconds between checks of the history file for days other processes appended (0 = off)
+HISTORY_SYNC_INTERVAL = float(os.environ.get('AQI_HISTORY_SYNC_INTERVAL', '10'))
+
+# Label for prediction log lines ("DASHBOARD", "PREDICTION", ...), set per request
+prediction_caller = contextvars.ContextVar('prediction_caller', default='UNKNOWN')
+
+
+def set_prediction_caller(tag):
+    """Attribute predictions in the current context to ``tag``; returns a reset token."""
+    return prediction_caller.set(tag)
+
+
+def reset_prediction_caller(token):
+    prediction_caller.reset(token)
+
+
+# Upper bound on memoized predictions (AQI values + concentration dicts)
+PREDICTION_CACHE_SIZE = int(os.environ.get('AQI_PREDICTION_CACHE_SIZE', '8192'))
+
+
+class PredictionCache:
+    """🗃️ THREAD-SAFE BOUNDED LRU CACHE FOR DETERMINISTIC PREDICTIONS"""
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # date string (key[1]) -> keys, so one day's entries can be dropped without a scan
+        self._keys_by_date = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if key not in self._data:
+                self._keys_by_date.setdefault(key[1], set()).add(key)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._unindex(evicted)
+
+    def _unindex(self, key):
+        keys = self._keys_by_date.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_date[key[1]]
+
+    def discard_dates(self, date_strs):
+        """Drop every entry for the given 'YYYY-MM-DD' dates; returns how many were dropped."""
+        dropped = 0
+        with self._lock:
+            for date_str in date_strs:
+                for key in self._keys_by_date.pop(date_str, ()):
+                    self._data.pop(key, None)
+                    dropped += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._keys_by_date.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class PredictionTable:
+    """🧊 PRECOMPUTED FEATURES + AQI PER MODEL FOR A CONTIGUOUS DATE WINDOW
+
+    Row ``i`` holds ``start + i days``. Lookups are index arithmetic, so any
+    date inside the window costs O(1) regardless of how it is requested.
+    """
+
+    def __init__(self, start, features, predictions, build_seconds=0.0):
+        self.start = np.datetime64(start, 'D')
+        self.features = features
+        self.predictions = predictions
+        self.build_seconds = build_seconds
+
+    def __len__(self):
+        return self.features.shape[0]
+
+    @property
+    def end(self):
+        return self.start + np.timedelta64(len(self) - 1, 'D')
+
+    def positions(self, index):
+        """Row for each date in a DatetimeIndex, -1 where outside the window."""
+        days = (index.normalize().to_numpy().astype('datetime64[D]') - self.start).astype(np.int64)
+        return np.where((days >= 0) & (days < len(self)), days, -1)
+
+    def lookup(self, date, model_key):
+        values = self.predictions.get(model_key)
+        if values is None:
+            return None
+        day = (np.datetime64(date, 'D') - self.start).astype(np.int64)
+        if 0 <= day < len(self):
+            return int(values[day])
+        return None
+
+    def nbytes(self):
+        return self.features.nbytes + sum(v.nbytes for v in self.predictions.values())
+
+    def describe(self):
+        return {
+            'start': str(self.start),
+            'end': str(self.end),
+            'days': len(self),
+            'models': list(self.predictions.keys()),
+            'build_seconds': round(self.build_seconds, 3),
+            'bytes': self.nbytes()
+        }
+
+def ensemble_weights(performances, model_keys):
+    """{model_key: weight} proportional to each model's R² (negative R² counts as 0).
+
+    Falls back to equal weights when no model has a positive R².
+    """
+    r2 = {key: max(0.0, float((performances.get(key) or {}).get('r2_score', 0) or 0)) for key in model_keys}
+    total = sum(r2.values())
+    if total <= 0:
+        return {key: 1.0 / len(model_keys) for key in model_keys} if model_keys else {}
+    return {key: value / total for key, value in r2.items()}
+
+
+def weighted_ensemble(predictions, weights):
+    """Per-date weighted mean of {model_key: [aqi, ...]}; models with None for a date are skipped."""
+    keys = [key for key in predictions if weights.get(key, 0) > 0]
+    if not keys:
+        return []
+    values = np.array([[np.nan if aqi is None else aqi for aqi in predictions[key]] for key in keys], dtype=np.float64)
+    w = np.array([weights[key] for key in keys])[:, None] * ~np.isnan(values)
+    totals = w.sum(axis=0)
+    means = np.nansum(values * w, axis=0) / np.where(totals > 0, totals, 1)
+    return [int(round(m)) if t > 0 else None for m, t in zip(means, totals)]
+
+
+# Processes for scoring large uncached date batches (0 = score in the request thread)
+PREDICTION_PROCESSES = int(os.environ.get('AQI_PREDICTION_PROCESSES', '0'))
+# Batches smaller than this are not worth the inter-process round trip
+POOL_MIN_CHUNK_DAYS = int(os.environ.get('AQI_POOL_MIN_CHUNK_DAYS', '128'))
+# After the pool fails to start or breaks, large batches stay in-process this long
+POOL_RETRY_SECONDS = float(os.environ.get('AQI_POOL_RETRY_SECONDS', '60'))
+
+_pool_worker_system = None
+
+
+def _init_pool_worker(model_path, backends, history_start, history_values):
+    """Load the models once per pool process, mirroring the parent's backends and history."""
+    global _pool_worker_system
+    configure_logging('WARNING')
+    system = AQIPredictionSystem()
+    system.prediction_pool.processes = 0
+    if not system.load_models(model_path, precompute_years=0) or not system.trained_models_loaded:
+        # Raising breaks the pool, which the parent backs off from (POOL_RETRY_SECONDS)
+        raise RuntimeError(f"pool worker could not load trained models from {model_path}")
+    for model_key, backend in backends.items():
+        if backend == 'numpy':
+            system.set_inference_backend(model_key, 'numpy')
+    system.history = AQIHistoryStore()
+    if history_start is not None:
+        system.history.extend(pd.Timestamp(history_start), history_values)
+    _pool_worker_system = system
+
+
+def _pool_ready():
+    return os.getpid()
+
+
+def _pool_predict(dates, model_key, history_start, history_base, history_tail):
+    """Catch up on days observed since the pool started, then score ``dates``."""
+    history = _pool_worker_system.history
+    have = len(history) - history_base
+    if have < len(history_tail):
+        history.extend(pd.Timestamp(history_start) + pd.Timedelta(days=len(history)), history_tail[have:])
+    return _pool_worker_system._predict_batch_with_trained_models(list(dates), model_key)
+
+
+class PredictionPool:
+    """🏭 PROCESS POOL THAT SCORES DATE CHUNKS IN PARALLEL
+
+    Each process loads the models once (initializer). ``warm`` starts them
+    ahead of the first large batch (AQIPredictionSystem.warm_prediction_pool,
+    called per serving process after fork); otherwise the first batch does.
+    ``predict`` splits a batch into one chunk per process and merges the
+    results in order. Days observed after the processes started travel with
+    each chunk, so appends do not restart the pool. A new ``generation``
+    (models, backends or a replaced history) starts fresh processes; the
+    old executor is retired without cancelling the chunks it is still
+    scoring. If the pool fails to start or breaks, batches are scored
+    in-process for POOL_RETRY_SECONDS before it is tried again.
+    """
+
+    def __init__(self, processes=PREDICTION_PROCESSES, min_chunk=POOL_MIN_CHUNK_DAYS,
+                 retry_seconds=POOL_RETRY_SECONDS):
+        self.processes = processes
+        self.min_chunk = min_chunk
+        self.retry_seconds = retry_seconds
+        self.batches = 0
+        self.failures = 0
+        self._executor = None
+        self._owner_pid = None
+        self._generation = None
+        self._history_base = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.processes > 1
+
+    def should_split(self, n_dates):
+        return self.enabled and n_dates >= 2 * self.min_chunk and time.monotonic() >= self._retry_at
+
+    def _get_executor(self, generation, model_args, history):
+        retired = None
+        with self._lock:
+            if self._owner_pid != os.getpid():
+                # Inherited across a fork: the processes belong to the parent
+                self._executor = None
+            if self._executor is not None and self._generation != generation:
+                retired, self._executor = self._executor, None
+            if self._executor is None:
+                values = history.values.copy()
+                start = str(history.start) if history.start is not None else None
+                # spawn: forking a threaded server process can deadlock the children
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_pool_worker, initargs=(*model_args, start, values))
+                self._owner_pid = os.getpid()
+                self._generation = generation
+                self._history_base = len(values)
+            executor, base = self._executor, self._history_base
+        if retired is not None:
+            retired.shutdown(wait=False)
+        return executor, base
+
+    def predict(self, dates, model_key, generation, model_args, history):
+        n_chunks = max(1, min(self.processes, len(dates) // self.min_chunk))
+        bounds = np.linspace(0, len(dates), n_chunks + 1).astype(int)
+        executor, base = self._get_executor(generation, model_args, history)
+        start = str(history.start) if history.start is not None else None
+        tail = history.values[base:].copy()
+        futures = [executor.submit(_pool_predict, dates[lo:hi], model_key, start, base, tail)
+                   for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.batches += 1
+        merged = []
+        try:
+            for future in futures:
+                merged.extend(future.result())
+        except BrokenProcessPool as e:
+            self._failed(executor, e)
+            raise
+        return merged
+
+    def warm(self, generation, model_args, history):
+        """Start every process now without waiting for the models to load in them."""
+        executor, _ = self._get_executor(generation, model_args, history)
+
+        def check_started(future):
+            if future.exception() is not None:
+                self._failed(executor, future.exception())
+
+        for _ in range(self.processes):
+            executor.submit(_pool_ready).add_done_callback(check_started)
+
+    def _failed(self, executor, error):
+        """A failed start or a dead worker breaks the whole executor; back off before the next one."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._retry_at = time.monotonic() + self.retry_seconds
+            self.failures += 1
+        logger.warning("⚠️ Prediction pool broke (%s); scoring in-process for %.0fs", error, self.retry_seconds)
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the processes once the chunks already submitted are scored."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def describe(self):
+        return {'processes': self.processes, 'min_chunk': self.min_chunk,
+                'running': self._executor is not None and self._owner_pid == os.getpid(),
+                'batches': self.batches, 'failures': self.failures,
+                'retry_in': round(max(0.0, self._retry_at - time.monotonic()), 1)}
+
+
+# Seconds between checks of the model artifact for changes (0 = no polling)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('AQI_MODEL_RELOAD_INTERVAL', '0'))
+# Days every reloaded model must score sensibly before it replaces the running ones
+RELOAD_SMOKE_DAYS = 14
+
+
+class ModelFileWatcher:
+    """👀 POLL A MODEL ARTIFACT AND HOT-RELOAD IT WHEN IT CHANGES
+
+    A change is acted on once size and mtime are unchanged over two polls,
+    so a file still being copied into place is not loaded half-written.
+    ``on_reload(status)`` is called after every reload attempt.
+    """
+
+    def __init__(self, system, path, interval=MODEL_RELOAD_INTERVAL, on_reload=None):
+        self.system = system
+        self.path = path
+        self.interval = interval
+        self.on_reload = on_reload
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _signature(self):
+        try:
+            if os.path.isdir(self.path):
+                return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                                    for entry in os.scandir(self.path) if entry.is_file()))
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='aqi-model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        seen = self._signature()
+        pending = None
+        while not self._stop.wait(self.interval):
+            signature = self._signature()
+            if signature is None or signature == seen:
+                pending = None
+                continue
+            if signature != pending:
+                pending = signature
+                continue
+            seen, pending = signature, None
+            logger.info("👀 Model artifact changed: %s", self.path)
+            status = self.system.reload_models(self.path)
+            if self.on_reload is not None:
+                self.on_reload(status)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@contextlib.contextmanager
+def _exclusive_file_lock(path):
+    """Hold an flock on ``path`` (created if missing); a no-op where fcntl is unavailable."""
+    if not HAS_FCNTL:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class HistoryFileWatcher:
+    """🔄 PULL DAYS OTHER PROCESSES WROTE TO THE HISTORY FILE INTO THIS ONE
+
+    Every ``interval`` seconds calls ``system.sync_history()``, which only
+    reads the file when its size or mtime changed.
+    """
+
+    def __init__(self, system, interval=HISTORY_SYNC_INTERVAL):
+        self.system = system
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='aqi-history-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.system.sync_history()
+            except Exception as e:
+                logger.warning("⚠️ AQI history sync failed: %s", e)
+
+
 class AQIPredictionSystem:
+    # Everything a model load sets; reload_models() replaces these together
+    MODEL_STATE_ATTRIBUTES = ('models', 'model_performances', 'best_model_name', 'trained_models',
+                              'trained_models_loaded', 'use_trained_models', 'compiled_models',
+                              'model_fingerprint', 'model_metadata', 'model_file_info',
+                              'feature_columns', 'prediction_table', 'model_path')
+
     def __init__(self):
         self.models = {}
         self.model_performances = {}
@@ -22,8 +548,29 @@ class AQIPredictionSystem:
         self.use_trained_models = False
         self.predictors = ["year", "month", "day", "weekday", "daily_avg_temp"]
         self.pollutants = ["PM2.5", "PM10", "CO", "NO2", "SO2", "O3"]
-        self._prediction_cache = {}
-        
+        self._prediction_cache = PredictionCache()
+        self.prediction_table = None
+        self.prediction_pool = PredictionPool()
+        self.model_path = None
+        self.compiled_models = {}
+        self.model_fingerprint = None
+        self.history = AQIHistoryStore()
+        self.history_path = None
+        # (path, (mtime_ns, size)) of the history file as last loaded or saved here
+        self._history_signature = None
+        # Serializes history loads, syncs and appends within this process
+        self._history_lock = threading.RLock()
+        # Bumped when the history is replaced wholesale; appends invalidate per date instead
+        self._history_epoch = 0
+        # UTC time of the last history load or append (HTTP Last-Modified)
+        self.history_updated_at = None
+        self.feature_columns = None
+        self.last_reload = None
+        self.prediction_store = (aqi_prediction_store.PredictionStore(aqi_prediction_store.STORE_PATH)
+                                 if aqi_prediction_store.STORE_PATH else None)
+        self._store_version_memo = None
+        self._reload_lock = threading.Lock()
+
         # Enhanced model metadata tracking
         self.model_metadata = {}
         self.model_file_info = {}
@@ -48,145 +595,337 @@ class AQIPredictionSystem:
             "O3": [(0.000, 0.054, 0, 50), (0.055, 0.070, 51, 100), (0.071, 0.085, 101, 150), 
                   (0.086, 0.105, 151, 200), (0.106, 0.200, 201, 300)]
         }
+        self.breakpoint_engine = BreakpointEngine(self.breakpoints)
 
     def debug_model_file(self, filename):
         """🔍 COMPREHENSIVE MODEL FILE DEBUG"""
-        print(f"\n🔍 DEBUGGING MODEL FILE: {filename}")
-        print("=" * 60)
+        logger.info("🔍 DEBUGGING MODEL FILE: %s", filename)
+        logger.info("=" * 60)
         
         if not os.path.exists(filename):
-            print(f"❌ FILE NOT FOUND: {filename}")
+            logger.error("❌ FILE NOT FOUND: %s", filename)
             return None
             
         try:
             # Get file info
             file_size = os.path.getsize(filename)
-            print(f"📁 File Size: {file_size:,} bytes ({file_size/1024/1024:.2f} MB)")
+            logger.info("📁 File Size: %s bytes (%.2f MB)", format(file_size, ','), file_size/1024/1024)
             
             # Load and inspect content
             with open(filename, 'rb') as f:
-                data = pickle.load(f)
+                raw = f.read()
+            fingerprint = hashlib.sha256(raw).hexdigest()
+            data = pickle.loads(raw)
+            del raw
+            logger.info("🔏 Fingerprint: %s", fingerprint[:16])
             
-            print(f"📦 File Type: {type(data)}")
+            logger.info("📦 File Type: %s", type(data))
             
             if isinstance(data, dict):
-                print(f"📋 Dictionary Keys: {list(data.keys())}")
+                logger.info("📋 Dictionary Keys: %s", list(data.keys()))
                 
                 for key, value in data.items():
-                    print(f"  🔑 {key}: {type(value)}")
+                    logger.info("  🔑 %s: %s", key, type(value))
                     
                     # Check if it's a model
                     if hasattr(value, 'predict'):
-                        print(f"    ✅ HAS PREDICT METHOD - This is a trained model!")
+                        logger.info("    ✅ HAS PREDICT METHOD - This is a trained model!")
                         
                         # Try to get more info about the model
                         model_type = type(value).__name__
-                        print(f"    🤖 Model Type: {model_type}")
+                        logger.info("    🤖 Model Type: %s", model_type)
                         
                         # Check for common sklearn attributes
                         if hasattr(value, 'feature_importances_'):
-                            print(f"    📊 Has feature importances")
+                            logger.info("    📊 Has feature importances")
                         if hasattr(value, 'n_features_'):
-                            print(f"    📏 Features: {value.n_features_}")
+                            logger.info("    📏 Features: %s", value.n_features_)
                         if hasattr(value, 'score'):
-                            print(f"    📈 Has score method")
+                            logger.info("    📈 Has score method")
                             
                     elif isinstance(value, (list, tuple)):
-                        print(f"    📝 Length: {len(value)}")
+                        logger.info("    📝 Length: %s", len(value))
                     elif isinstance(value, dict):
-                        print(f"    📚 Sub-dictionary with {len(value)} keys")
+                        logger.info("    📚 Sub-dictionary with %s keys", len(value))
                         
             elif hasattr(data, 'predict'):
-                print("🤖 SINGLE MODEL DETECTED")
-                print(f"   Model Type: {type(data).__name__}")
+                logger.info("🤖 SINGLE MODEL DETECTED")
+                logger.info("   Model Type: %s", type(data).__name__)
                 
             else:
-                print(f"❓ Unknown structure: {type(data)}")
+                logger.info("❓ Unknown structure: %s", type(data))
                 
             self.model_file_info = {
                 'exists': True,
                 'size': file_size,
                 'type': type(data).__name__,
-                'content': data
+                'fingerprint': fingerprint
             }
+            self._set_model_fingerprint(fingerprint)
             
             return data
             
         except Exception as e:
-            print(f"❌ DEBUG ERROR: {e}")
+            logger.error("❌ DEBUG ERROR: %s", e)
             return None
 
-    def load_models(self, filename):
-        """🤖 ENHANCED MODEL LOADING WITH COMPREHENSIVE DEBUG"""
-        print(f"\n🚀 LOADING MODELS FROM: {filename}")
+    def _set_model_fingerprint(self, fingerprint):
+        """🔏 RECORD THE LOADED ARTIFACT AND DROP PREDICTIONS FROM ANY OTHER ONE"""
+        if fingerprint != self.model_fingerprint:
+            self._prediction_cache.clear()
+        self.model_fingerprint = fingerprint
+
+    def get_cache_stats(self):
+        """📈 PREDICTION CACHE COUNTERS"""
+        stats = self._prediction_cache.stats()
+        stats['model_fingerprint'] = self.model_fingerprint
+        return stats
+
+    def _store_version(self):
+        """💾 PREDICTION STORE VERSION (MODEL FINGERPRINT), None WHEN THE STORE IS OFF
+
+        Only trained-model predictions are stored; simulation is cheaper to
+        recompute than to read. The first use of a new version queues the
+        deletion of every other one, so the file only holds the current
+        model's predictions.
+        """
+        fingerprint = self.model_fingerprint
+        if (self.prediction_store is None or not fingerprint
+                or not (self.use_trained_models and self.trained_models_loaded)):
+            return None
+        version = fingerprint[:32]
+        if self._store_version_memo != version:
+            self._store_version_memo = version
+            self.prediction_store.prune_other_versions(version)
+        return version
+
+    def _store_lag_keys(self, dates):
+        """💾 PER-DATE STORE KEY OF THE OBSERVED LAG FEATURES ('' WHERE THEY ARE GENERATED)"""
+        index = pd.DatetimeIndex([self._to_datetime(d) for d in dates]).normalize()
+        rows = self.history.features_for(index)
+        return ['' if np.isnan(row[0]) else hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest()
+                for row in rows]
+
+    def _cache_key(self, kind, date, model_name=None):
+        """🔑 (kind, date, model, model-file fingerprint, history version) CACHE KEY
+
+        Forecasts roll forward over the observed days, so they are keyed on
+        the history length; single-day predictions only change when their own
+        lag window does (see record_observed_aqi) and are keyed on the epoch.
+        """
+        date_str = self._to_datetime(date).strftime('%Y-%m-%d')
+        if self.use_trained_models and self.trained_models_loaded:
+            model_key = self._resolve_model_name(model_name)
+        else:
+            model_key = 'simulation'
+        history_version = len(self.history) if kind.startswith('forecast') else self._history_epoch
+        return (kind, date_str, model_key, self.model_fingerprint, history_version)
+
+    def load_models(self, filename, precompute_years=None):
+        """🤖 ENHANCED MODEL LOADING WITH COMPREHENSIVE DEBUG
+
+        After trained models load, a prediction table is built for
+        ``precompute_years`` either side of the current year (default
+        AQI_PRECOMPUTE_YEARS; 0 skips the warm-up).
+        """
+        started = time.perf_counter()
+        if self._load_models(filename):
+            MODEL_LOAD_SECONDS.set(round(time.perf_counter() - started, 6))
+            MODEL_LOADS.inc(outcome='trained' if self.trained_models_loaded else 'simulation')
+            self.model_path = filename
+            for model_key in self._loaded_model_keys():
+                self._apply_default_backend(model_key)
+            if os.path.exists(HISTORY_PATH):
+                self.load_history(HISTORY_PATH)
+            if precompute_years is None:
+                precompute_years = PRECOMPUTE_YEARS
+            if precompute_years > 0 and self.use_trained_models and self.trained_models_loaded:
+                this_year = datetime.now().year
+                self.build_prediction_table(datetime(this_year - precompute_years, 1, 1),
+                                            datetime(this_year + precompute_years, 12, 31))
+            return True
+        MODEL_LOADS.inc(outcome='failed')
+        return False
+
+    def reload_models(self, filename=None, precompute_years=None):
+        """♻️ HOT-SWAP A NEW MODEL ARTIFACT WITHOUT BLOCKING PREDICTIONS
+
+        The artifact is loaded into a separate AQIPredictionSystem that shares
+        this one's history. Every model in it - all of a lazy directory's
+        models, not just the best one - must load and score a smoke batch, and
+        the prediction table is built there too. Only then are the
+        MODEL_STATE_ATTRIBUTES replaced on this instance in a single dict
+        update. Requests keep using the old models until that moment and never
+        wait on the load. A rejected artifact leaves the current models
+        serving. Only one reload runs at a time; a concurrent call returns
+        status 'busy'. Returns the status dict, also kept in ``last_reload``.
+        """
+        filename = filename or self.model_path or default_model_path()
+        if not self._reload_lock.acquire(blocking=False):
+            return {'status': 'busy', 'path': filename}
+        started = time.perf_counter()
+        try:
+            candidate = AQIPredictionSystem()
+            candidate.history = self.history
+            problem = candidate._load_reload_candidate(filename, precompute_years)
+            seconds = round(time.perf_counter() - started, 3)
+            status = {'path': filename, 'seconds': seconds,
+                      'finished_at': datetime.now().isoformat(timespec='seconds')}
+            if problem:
+                logger.error("❌ Model reload rejected (%s): %s", filename, problem)
+                MODEL_LOADS.inc(outcome='reload_rejected')
+                status.update(status='rejected', reason=problem, fingerprint=self.model_fingerprint)
+            else:
+                self._adopt_models(candidate)
+                MODEL_LOAD_SECONDS.set(seconds)
+                MODEL_LOADS.inc(outcome='reloaded')
+                logger.info("♻️ Models reloaded from %s in %.2fs (fingerprint %s)",
+                            filename, seconds, self.model_fingerprint)
+                status.update(status='reloaded', fingerprint=self.model_fingerprint,
+                              models=self._loaded_model_keys(), best_model=self.best_model_name)
+            self.last_reload = status
+            return status
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def _load_reload_candidate(self, filename, precompute_years):
+        """Load + validate into this (fresh) instance; returns a problem string or None."""
+        try:
+            if not self._load_models(filename):
+                return "artifact could not be loaded"
+        except Exception as e:
+            return f"load error: {e}"
+        if not (self.use_trained_models and self.trained_models_loaded):
+            return "no trained models found in the artifact"
+        # A lazy directory loads only the best model up front; the rest must load now or be rejected
+        for model_key in list(self.trained_models.keys()):
+            try:
+                self.trained_models[model_key]
+            except Exception as e:
+                return f"{model_key}: load error: {e}"
+        self.model_path = filename
+        for model_key in self._loaded_model_keys():
+            self._apply_default_backend(model_key)
+        problem = self.smoke_test()
+        if problem:
+            return problem
+        if precompute_years is None:
+            precompute_years = PRECOMPUTE_YEARS
+        if precompute_years > 0:
+            this_year = datetime.now().year
+            self.build_prediction_table(datetime(this_year - precompute_years, 1, 1),
+                                        datetime(this_year + precompute_years, 12, 31))
+        return None
+
+    def smoke_test(self, days=RELOAD_SMOKE_DAYS):
+        """🧪 EVERY LOADED MODEL SCORES ``days`` DAYS FROM TODAY; RETURNS A PROBLEM STRING OR None"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        dates = [today + timedelta(days=i) for i in range(days)]
+        for model_key in self._loaded_model_keys():
+            aqis = self._predict_batch_with_trained_models(dates, model_key)
+            if any(aqi is None for aqi in aqis):
+                return f"{model_key}: smoke batch failed"
+            values = np.asarray(aqis, dtype=np.float64)
+            if not np.all(np.isfinite(values)) or values.min() < 0 or values.max() > 500:
+                return f"{model_key}: smoke batch AQI outside 0..500"
+        return None
+
+    def _adopt_models(self, candidate):
+        """🔀 TAKE OVER A VALIDATED CANDIDATE'S MODEL STATE IN ONE STEP"""
+        if isinstance(candidate.trained_models, aqi_model_store.LazyModelDict):
+            candidate.trained_models.on_load = self._on_model_loaded
+        state = {name: getattr(candidate, name) for name in self.MODEL_STATE_ATTRIBUTES}
+        # Holding the outgoing objects until after the update means no destructor
+        # runs inside it, so other threads see either the old state or the new one
+        previous = {name: self.__dict__.get(name) for name in self.MODEL_STATE_ATTRIBUTES}
+        self.__dict__.update(state)
+        del previous
+        # Pool workers hold the old models; the new fingerprint makes the next large batch start fresh ones
+        self._prediction_cache.clear()
+
+    def _load_models(self, filename):
+        self.prediction_table = None
+        self.compiled_models = {}
+        if aqi_model_store.is_artifact_dir(filename):
+            if self._load_model_artifacts(filename):
+                return True
+            logger.warning("⚠️ Model artifact directory unusable, using high-performance simulation")
+            self._set_high_performance_metrics()
+            return True
+        
+        logger.info("🚀 LOADING MODELS FROM: %s", filename)
         
         # Step 1: Debug the file
         model_data = self.debug_model_file(filename)
         
         if model_data is None:
-            print("❌ Model file debug failed, using high-performance fallback")
+            logger.error("❌ Model file debug failed, using high-performance fallback")
             self._set_high_performance_metrics()
             return True
             
         # Step 2: Try to load your specific models
         if self._load_your_trained_models(model_data, filename):
-            print("🎉 SUCCESS: Your trained models loaded!")
+            logger.info("🎉 SUCCESS: Your trained models loaded!")
             return True
             
         # Step 3: Try PyCaret format
         if self._load_pycaret_models(model_data):
-            print("🎉 SUCCESS: PyCaret models loaded!")
+            logger.info("🎉 SUCCESS: PyCaret models loaded!")
             return True
             
         # Step 4: Try generic model loading
         if self._load_generic_models(model_data):
-            print("🎉 SUCCESS: Generic models loaded!")
+            logger.info("🎉 SUCCESS: Generic models loaded!")
             return True
             
         # Step 5: Fallback
-        print("⚠️ No compatible models found, using high-performance simulation")
+        logger.warning("⚠️ No compatible models found, using high-performance simulation")
         self._set_high_performance_metrics()
         return True
 
     def _load_your_trained_models(self, model_data, filename):
         """🎯 FIXED: Load YOUR trained models from PyCaret structure"""
-        print("\n🎯 ATTEMPTING TO LOAD YOUR TRAINED MODELS...")
+        logger.info("🎯 ATTEMPTING TO LOAD YOUR TRAINED MODELS...")
         
         try:
             # Your models are in data['models'][model_name]['model']
             if isinstance(model_data, dict) and 'models' in model_data:
                 models_dict = model_data['models']
-                print(f"📦 Found 'models' dictionary with {len(models_dict)} items")
-                print(f"🔑 Model keys: {list(models_dict.keys())}")
+                logger.info("📦 Found 'models' dictionary with %s items", len(models_dict))
+                logger.info("🔑 Model keys: %s", list(models_dict.keys()))
                 
                 # Store metadata
                 if 'best_model' in model_data:
                     best_model_name = model_data['best_model']
-                    print(f"🏆 Best model indicated: {best_model_name}")
+                    logger.info("🏆 Best model indicated: %s", best_model_name)
                 
                 if 'feature_columns' in model_data:
                     feature_cols = model_data['feature_columns']
-                    print(f"📊 Feature columns ({len(feature_cols)}): {feature_cols}")
+                    logger.info("📊 Feature columns (%s): %s", len(feature_cols), feature_cols)
                     self.feature_columns = feature_cols
                 
                 if 'training_info' in model_data:
                     training_info = model_data['training_info']
-                    print(f"📈 Training info: {list(training_info.keys())}")
+                    logger.info("📈 Training info: %s", list(training_info.keys()))
                     if 'training_date' in training_info:
-                        print(f"   📅 Trained on: {training_info['training_date']}")
+                        logger.info("   📅 Trained on: %s", training_info['training_date'])
                     if 'data_samples' in training_info:
-                        print(f"   📊 Training samples: {training_info['data_samples']:,}")
+                        logger.info("   📊 Training samples: %s", format(training_info['data_samples'], ','))
                 
                 # Extract actual model objects
                 loaded_models = {}
                 model_performances = {}
                 
                 for model_key, model_info in models_dict.items():
-                    print(f"\n🔍 Examining '{model_key}':")
-                    print(f"   📦 Type: {type(model_info)}")
+                    logger.info("🔍 Examining '%s':", model_key)
+                    logger.info("   📦 Type: %s", type(model_info))
                     
                     if isinstance(model_info, dict):
-                        print(f"   🔑 Keys: {list(model_info.keys())}")
+                        logger.info("   🔑 Keys: %s", list(model_info.keys()))
                         
                         # Get the actual model object (PyCaret stores it under 'model' key)
                         if 'model' in model_info:
@@ -194,32 +933,32 @@ class AQIPredictionSystem:
                             
                             if hasattr(actual_model, 'predict'):
                                 loaded_models[model_key] = actual_model
-                                print(f"   ✅ Successfully loaded: {type(actual_model).__name__}")
+                                logger.info("   ✅ Successfully loaded: %s", type(actual_model).__name__)
                                 
                                 # Get model info
                                 if hasattr(actual_model, 'feature_importances_'):
-                                    print(f"      📊 Has feature importances")
+                                    logger.info("      📊 Has feature importances")
                                 if hasattr(actual_model, 'n_features_in_'):
-                                    print(f"      📏 Features expected: {actual_model.n_features_in_}")
+                                    logger.info("      📏 Features expected: %s", actual_model.n_features_in_)
                                 
                                 # Extract performance metrics
                                 if 'performance' in model_info:
                                     perf = model_info['performance']
                                     model_performances[model_key] = perf
-                                    print(f"      📈 R²: {perf.get('r2_score', 0):.4f}")
-                                    print(f"      📉 MAE: {perf.get('mae', 0):.4f}")
-                                    print(f"      📊 RMSE: {perf.get('rmse', 0):.4f}")
+                                    logger.info("      📈 R²: %.4f", perf.get('r2_score', 0))
+                                    logger.info("      📉 MAE: %.4f", perf.get('mae', 0))
+                                    logger.info("      📊 RMSE: %.4f", perf.get('rmse', 0))
                                 
                                 # Check if tuning was used
                                 if 'used_tuning' in model_info:
                                     tuning_used = model_info['used_tuning']
-                                    print(f"      🔧 Tuning used: {tuning_used}")
+                                    logger.info("      🔧 Tuning used: %s", tuning_used)
                             else:
-                                print(f"   ❌ Object under 'model' key has no predict method: {type(actual_model)}")
+                                logger.error("   ❌ Object under 'model' key has no predict method: %s", type(actual_model))
                         else:
-                            print(f"   ❌ No 'model' key found in {model_key} info")
+                            logger.error("   ❌ No 'model' key found in %s info", model_key)
                     else:
-                        print(f"   ❌ {model_key} is not a dictionary: {type(model_info)}")
+                        logger.error("   ❌ %s is not a dictionary: %s", model_key, type(model_info))
                 
                 # If we successfully loaded models
                 if loaded_models:
@@ -229,53 +968,165 @@ class AQIPredictionSystem:
                     self.model_performances = model_performances
                     
                     # Set best model
-                    if 'best_model' in model_data and model_data['best_model'] in loaded_models:
-                        self.best_model_name = model_data['best_model']
-                        print(f"🏆 Using your best model: {self.best_model_name}")
-                    else:
-                        # Find best model by R² score
-                        best_r2 = -1
-                        best_model = None
-                        for model_name, perf in model_performances.items():
-                            r2 = perf.get('r2_score', 0)
-                            if r2 > best_r2:
-                                best_r2 = r2
-                                best_model = model_name
-                        
-                        if best_model:
-                            self.best_model_name = best_model
-                            print(f"🎯 Auto-selected best model: {self.best_model_name} (R²: {best_r2:.4f})")
-                        else:
-                            self.best_model_name = list(loaded_models.keys())[0]
-                            print(f"🔄 Using first available model: {self.best_model_name}")
+                    self._select_best_model(model_data.get('best_model'))
                     
-                    print(f"\n🚀 SUCCESS! YOUR PYCARET MODELS LOADED!")
-                    print(f"📊 Loaded {len(loaded_models)} models: {list(loaded_models.keys())}")
-                    print(f"🏆 Best model: {self.best_model_name}")
-                    print(f"📈 Best R² score: {model_performances.get(self.best_model_name, {}).get('r2_score', 'N/A')}")
+                    logger.info("🚀 SUCCESS! YOUR PYCARET MODELS LOADED!")
+                    logger.info("📊 Loaded %s models: %s", len(loaded_models), list(loaded_models.keys()))
+                    logger.info("🏆 Best model: %s", self.best_model_name)
+                    logger.info("📈 Best R² score: %s", model_performances.get(self.best_model_name, {}).get('r2_score', 'N/A'))
                     
                     return True
                 else:
-                    print("❌ No valid models found in the 'models' dictionary")
+                    logger.error("❌ No valid models found in the 'models' dictionary")
                     return False
             else:
-                print("❌ No 'models' key found in data structure")
+                logger.error("❌ No 'models' key found in data structure")
                 return False
                 
         except Exception as e:
-            print(f"❌ Error loading your PyCaret models: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error loading your PyCaret models: %s", e)
+            return False
+
+    def _select_best_model(self, best_model_hint=None):
+        """🏆 PICK THE ARTIFACT'S BEST MODEL, ELSE HIGHEST R², ELSE THE FIRST"""
+        if best_model_hint and best_model_hint in self.trained_models:
+            self.best_model_name = best_model_hint
+            logger.info("🏆 Using your best model: %s", self.best_model_name)
+            return
+        
+        # Find best model by R² score
+        best_r2 = -1
+        best_model = None
+        for model_name, perf in self.model_performances.items():
+            r2 = perf.get('r2_score', 0)
+            if r2 > best_r2 and model_name in self.trained_models:
+                best_r2 = r2
+                best_model = model_name
+        
+        if best_model:
+            self.best_model_name = best_model
+            logger.info("🎯 Auto-selected best model: %s (R²: %.4f)", self.best_model_name, best_r2)
+        else:
+            self.best_model_name = list(self.trained_models.keys())[0]
+            logger.info("🔄 Using first available model: %s", self.best_model_name)
+
+    def _load_model_artifacts(self, directory):
+        """🦥 LOAD A SPLIT ARTIFACT DIRECTORY; ONLY THE BEST MODEL LOADS NOW"""
+        logger.info("🦥 LOADING MODEL MANIFEST FROM: %s", directory)
+        try:
+            manifest = aqi_model_store.read_manifest(directory)
+        except Exception as e:
+            logger.error("❌ Model manifest error: %s", e)
+            return False
+        if not manifest.get('models'):
+            logger.error("❌ Manifest lists no models")
             return False
+        
+        self.feature_columns = manifest.get('feature_columns') or list(EXACT_FEATURE_COLUMNS)
+        self.model_performances = {key: info.get('performance', {}) for key, info in manifest['models'].items()}
+        self.trained_models = aqi_model_store.LazyModelDict(directory, manifest, on_load=self._on_model_loaded)
+        self.trained_models_loaded = True
+        self.use_trained_models = True
+        self.model_file_info = {
+            'exists': True,
+            'type': 'manifest',
+            'path': directory,
+            'fingerprint': manifest.get('source_fingerprint'),
+            'models': {key: info.get('type') for key, info in manifest['models'].items()}
+        }
+        self._set_model_fingerprint(manifest.get('source_fingerprint'))
+        self._select_best_model(manifest.get('best_model'))
+        
+        # Warm the model that serves requests without an explicit model name
+        self.trained_models[self.best_model_name]
+        logger.info("📊 %d models available, loaded now: %s", len(self.trained_models), self._loaded_model_keys())
+        return True
+
+    def _loaded_model_keys(self):
+        """🔑 MODELS ALREADY IN MEMORY (ALL OF THEM UNLESS LOADING LAZILY)"""
+        if hasattr(self.trained_models, 'loaded_keys'):
+            return self.trained_models.loaded_keys()
+        return list(self.trained_models.keys())
+
+    def load_all_models(self):
+        """📥 FORCE-LOAD EVERY LAZILY LOADED MODEL (e.g. before forking workers)"""
+        for model_key in list(self.trained_models.keys()):
+            self.trained_models[model_key]
+        return self._loaded_model_keys()
+
+    def _on_model_loaded(self, model_key, model):
+        """🦥 FIRST USE OF A LAZILY LOADED MODEL: ADD IT TO THE PREDICTION TABLE"""
+        logger.info("🦥 Loaded model on first use: %s (%s)", model_key, type(model).__name__)
+        self._apply_default_backend(model_key)
+        table = self.prediction_table
+        if table is not None and model_key not in table.predictions:
+            features_df = self._features_frame(table.features)
+            aqis = self._predict_features_with_model(model_key, features_df)
+            if aqis is not None:
+                table.predictions[model_key] = aqis.astype(np.int16)
+
+    def _apply_default_backend(self, model_key):
+        selected = {key.strip() for key in NUMPY_TREE_MODELS.split(',') if key.strip()}
+        if 'all' in selected or model_key in selected:
+            self.set_inference_backend(model_key, 'numpy')
+
+    def set_inference_backend(self, model_name, backend):
+        """🌲 SERVE A MODEL WITH 'numpy' (COMPILED TREES) OR 'sklearn'
+
+        The compiled ensemble is checked against sklearn's predict() on a
+        year of real feature rows before it is used. Unsupported estimators
+        or any mismatch keep sklearn. Returns the backend now in effect.
+        """
+        model_key = self._resolve_model_name(model_name)
+        if backend == 'sklearn':
+            self.compiled_models.pop(model_key, None)
+            return 'sklearn'
+        if backend != 'numpy':
+            raise ValueError(f"Unknown inference backend: {backend}")
+        
+        model = self.trained_models[model_key]
+        try:
+            compiled = aqi_tree_engine.compile_ensemble(model)
+            this_year = datetime.now().year
+            check_dates = pd.date_range(datetime(this_year, 1, 1), datetime(this_year, 12, 31), freq='D')
+            check_features = self._features_frame(self._compute_feature_matrix(check_dates))
+            max_error = aqi_tree_engine.verify_against_model(compiled, model, check_features)
+        except (aqi_tree_engine.UnsupportedModelError, ValueError) as e:
+            logger.warning("⚠️ %s stays on sklearn: %s", model_key, e)
+            self.compiled_models.pop(model_key, None)
+            return 'sklearn'
+        
+        self.compiled_models[model_key] = compiled
+        logger.info("🌲 %s compiled to NumPy: %d trees, depth %d, %.1f KB, max |Δ| %.2g",
+                    model_key, compiled.n_trees, compiled.max_depth, compiled.nbytes() / 1024, max_error)
+        return 'numpy'
+
+    def get_inference_backends(self):
+        """🌲 {model: 'numpy' | 'sklearn'} FOR THE MODELS IN MEMORY"""
+        return {key: 'numpy' if key in self.compiled_models else 'sklearn'
+                for key in self._loaded_model_keys()}
+
+    def _model_predict(self, model_key, features_df):
+        """🤖 predict() THROUGH THE COMPILED ENGINE WHEN ONE IS SELECTED"""
+        started = time.perf_counter()
+        compiled = self.compiled_models.get(model_key)
+        if compiled is not None:
+            predictions = compiled.predict(features_df.to_numpy(dtype=np.float64))
+        else:
+            predictions = self.trained_models[model_key].predict(features_df)
+        elapsed = time.perf_counter() - started
+        MODEL_PREDICT_SECONDS.observe(elapsed, model=model_key, backend='numpy' if compiled is not None else 'sklearn')
+        STAGE_SECONDS.observe(elapsed, stage='model_predict')
+        return predictions
 
     def _load_pycaret_models(self, model_data):
         """🏗️ LOAD PYCARET FORMAT MODELS"""
-        print("\n🏗️ TRYING PYCARET FORMAT...")
+        logger.info("🏗️ TRYING PYCARET FORMAT...")
         
         try:
             if isinstance(model_data, dict) and 'final_models' in model_data:
                 final_models = model_data['final_models']
-                print(f"📦 Found final_models: {type(final_models)}")
+                logger.info("📦 Found final_models: %s", type(final_models))
                 
                 if final_models:
                     self.trained_models = final_models
@@ -283,18 +1134,18 @@ class AQIPredictionSystem:
                     self.use_trained_models = True
                     self._set_high_performance_metrics()
                     
-                    print("✅ PyCaret models loaded successfully")
+                    logger.info("✅ PyCaret models loaded successfully")
                     return True
                     
             return False
             
         except Exception as e:
-            print(f"❌ PyCaret loading error: {e}")
+            logger.error("❌ PyCaret loading error: %s", e)
             return False
 
     def _load_generic_models(self, model_data):
         """🔧 GENERIC MODEL LOADING"""
-        print("\n🔧 TRYING GENERIC MODEL LOADING...")
+        logger.info("🔧 TRYING GENERIC MODEL LOADING...")
         
         try:
             models_found = {}
@@ -302,14 +1153,14 @@ class AQIPredictionSystem:
             # If it's a single model
             if hasattr(model_data, 'predict'):
                 models_found['main_model'] = model_data
-                print("✅ Single model detected")
+                logger.info("✅ Single model detected")
                 
             # If it's a dictionary, look for anything with predict
             elif isinstance(model_data, dict):
                 for key, value in model_data.items():
                     if hasattr(value, 'predict'):
                         models_found[key] = value
-                        print(f"✅ Found model: {key}")
+                        logger.info("✅ Found model: %s", key)
                         
             if models_found:
                 self.trained_models = models_found
@@ -320,158 +1171,608 @@ class AQIPredictionSystem:
                 # Use first model as best
                 self.best_model_name = list(models_found.keys())[0]
                 
-                print(f"✅ Generic loading: {len(models_found)} models")
+                logger.info("✅ Generic loading: %s models", len(models_found))
                 return True
                 
             return False
             
         except Exception as e:
-            print(f"❌ Generic loading error: {e}")
+            logger.error("❌ Generic loading error: %s", e)
             return False
 
-    def _create_features_for_date(self, target_date):
-        """🤖 CREATE FEATURES MATCHING YOUR PYCARET TRAINING"""
-        if isinstance(target_date, str):
-            target_date = datetime.strptime(target_date, '%Y-%m-%d')
-        
-        # Your exact feature columns from training:
-        # ['year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend', 'daily_avg_temp', 
-        #  'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 'aqi_ma_3', 'aqi_ma_7', 'aqi_trend_3', 'aqi_volatility']
-        
-        print(f"🎯 Creating features for {target_date.strftime('%Y-%m-%d')}")
-
-        date_seed = int(hashlib.md5(target_date.strftime('%Y-%m-%d').encode()).hexdigest()[:8], 16) % (2**32)
-        np.random.seed(date_seed)
-        
-        # Basic date features (exact match to your training)
-        features = {
-            'year': int(target_date.year),
-            'month': int(target_date.month),
-            'day': int(target_date.day),
-            'weekday': int(target_date.weekday()),
-            'day_of_year': int(target_date.timetuple().tm_yday),
-            'is_weekend': int(1 if target_date.weekday() >= 5 else 0),
-        }
-        
-        # Temperature feature (seasonal proxy)
-        day_of_year = target_date.timetuple().tm_yday
-        seasonal_temp = 25 + 10 * np.sin(2 * np.pi * day_of_year / 365)  # Ranges ~15-35°C
-        features['daily_avg_temp'] = float(round(seasonal_temp, 2))  # ✅ FIXED: Convert to float
-        
-        # AQI lag and trend features (realistic defaults for prediction)
-        # These would normally come from historical data, but we'll use intelligent defaults
-        base_aqi = 45 + 15 * np.sin(2 * np.pi * day_of_year / 365)  # Seasonal AQI pattern
-        
-        features.update({
-            'aqi_lag_1': float(round(base_aqi + np.random.normal(0, 5), 2)),  # ✅ FIXED: Convert to float
-            'aqi_lag_3': float(round(base_aqi + np.random.normal(0, 7), 2)),  # ✅ FIXED: Convert to float
-            'aqi_lag_7': float(round(base_aqi + np.random.normal(0, 10), 2)), # ✅ FIXED: Convert to float
-            'aqi_ma_3': float(round(base_aqi + np.random.normal(0, 3), 2)),   # ✅ FIXED: Convert to float
-            'aqi_ma_7': float(round(base_aqi + np.random.normal(0, 4), 2)),   # ✅ FIXED: Convert to float
-            'aqi_trend_3': float(round(np.random.normal(0, 8), 2)),           # ✅ FIXED: Convert to float
-            'aqi_volatility': float(round(abs(np.random.normal(8, 3)), 2))    # ✅ FIXED: Convert to float
-        })
-
-        # Reset random seed to avoid affecting other parts
-        np.random.seed(None)
-
-        # ✅ FIXED: Define the exact column order from your training
-        exact_column_order = [
-            'year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend', 
-            'daily_avg_temp', 'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 
-            'aqi_ma_3', 'aqi_ma_7', 'aqi_trend_3', 'aqi_volatility'
-        ]
-        
-        # ✅ FIXED: Create DataFrame with exact column order
+    def _to_datetime(self, date):
+        """📅 NORMALIZE str / datetime64 / datetime INPUT"""
+        if isinstance(date, str):
+            return datetime.strptime(date, '%Y-%m-%d')
+        if isinstance(date, np.datetime64):
+            return pd.Timestamp(date).to_pydatetime()
+        return date
+
+    def _feature_column_order(self):
+        """📋 COLUMN ORDER USED FOR MODEL INPUT"""
         if hasattr(self, 'feature_columns') and self.feature_columns:
-            # Use exact order from training
-            ordered_features = {col: features.get(col, 0.0) for col in self.feature_columns}  # ✅ FIXED: Default to 0.0
-            features_df = pd.DataFrame([ordered_features])
-            print(f"📊 Created features using training column order: {self.feature_columns}")
-        else:
-            # Use the exact column order
-            ordered_features = {col: features.get(col, 0.0) for col in exact_column_order}  # ✅ FIXED: Default to 0.0
-            features_df = pd.DataFrame([ordered_features])
-            print(f"📊 Created features using exact column order: {exact_column_order}")
+            return list(self.feature_columns)
+        return list(EXACT_FEATURE_COLUMNS)
+
+    def _date_feature_matrix(self, dates):
+        """🧮 BUILD AN (N, 14) FEATURE MATRIX FOR A BATCH OF DATES
+
+        Columns follow EXACT_FEATURE_COLUMNS. Calendar and seasonal columns are
+        computed with NumPy over the whole batch; the seeded lag/trend noise is
+        drawn per date so every row matches the single-date path exactly.
+        """
+        index = pd.DatetimeIndex(pd.to_datetime([self._to_datetime(d) for d in dates]))
         
-        # ✅ CRITICAL FIX: Ensure all values are numeric
-        for col in features_df.columns:
-            features_df[col] = pd.to_numeric(features_df[col], errors='coerce')
+        table = self.prediction_table
+        if table is None:
+            return self._compute_feature_matrix(index)
         
-        # ✅ CRITICAL FIX: Fill any NaN values with 0
-        features_df = features_df.fillna(0.0)
+        # Rows inside the precomputed window are copied, the rest computed
+        positions = table.positions(index)
+        inside = positions >= 0
+        if inside.all():
+            return table.features[positions]
+        matrix = np.empty((len(index), len(EXACT_FEATURE_COLUMNS)), dtype=np.float64)
+        matrix[inside] = table.features[positions[inside]]
+        matrix[~inside] = self._compute_feature_matrix(index[~inside])
+        return matrix
+
+    def _compute_feature_matrix(self, index):
+        """🧮 FEATURE MATRIX FOR A DatetimeIndex (no table lookup)"""
+        started = time.perf_counter()
+        n = len(index)
+        day_of_year = index.dayofyear.to_numpy(dtype=np.float64)
+        weekday = index.weekday.to_numpy(dtype=np.float64)
+
+        matrix = np.empty((n, len(EXACT_FEATURE_COLUMNS)), dtype=np.float64)
+        matrix[:, 0] = index.year
+        matrix[:, 1] = index.month
+        matrix[:, 2] = index.day
+        matrix[:, 3] = weekday
+        matrix[:, 4] = day_of_year
+        matrix[:, 5] = weekday >= 5
+
+        # Temperature feature (seasonal proxy), ranges ~15-35°C
+        matrix[:, 6] = np.round(25 + 10 * np.sin(2 * np.pi * day_of_year / 365), 2)
+
+        # AQI lag and trend features (seeded per date around a seasonal AQI pattern)
+        base_aqi = 45 + 15 * np.sin(2 * np.pi * day_of_year / 365)
+        noise = np.empty((n, len(LAG_NOISE_LOC)), dtype=np.float64)
+        for i, date_str in enumerate(index.strftime('%Y-%m-%d')):
+            date_seed = int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
+            noise[i] = np.random.default_rng(date_seed).normal(LAG_NOISE_LOC, LAG_NOISE_SCALE)
+
+        matrix[:, 7:12] = np.round(base_aqi[:, None] + noise[:, :5], 2)
+        matrix[:, 12] = np.round(noise[:, 5], 2)
+        matrix[:, 13] = np.round(np.abs(noise[:, 6]), 2)
+
+        # Real lag features wherever the history store covers the previous week
+        if len(self.history):
+            real_lags = self.history.features_for(index)
+            known = ~np.isnan(real_lags).any(axis=1)
+            matrix[known, 7:14] = real_lags[known]
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='feature_build')
+        return matrix
+
+    def _features_frame(self, matrix):
+        """📊 WRAP A FEATURE MATRIX IN THE TRAINING COLUMN ORDER"""
+        columns = self._feature_column_order()
+        if columns != EXACT_FEATURE_COLUMNS:
+            positions = {col: i for i, col in enumerate(EXACT_FEATURE_COLUMNS)}
+            ordered = np.zeros((matrix.shape[0], len(columns)), dtype=np.float64)
+            for j, col in enumerate(columns):
+                if col in positions:
+                    ordered[:, j] = matrix[:, positions[col]]
+            matrix = ordered
+        return pd.DataFrame(matrix, columns=columns)
+
+    def _create_features_for_date(self, target_date):
+        """🤖 CREATE FEATURES MATCHING YOUR PYCARET TRAINING"""
+        target_date = self._to_datetime(target_date)
         
-        print(f"🔢 Sample features: year={features['year']}, month={features['month']}, temp={features['daily_avg_temp']:.1f}°C")
-        print(f"📈 AQI context: lag_1={features['aqi_lag_1']:.1f}, ma_7={features['aqi_ma_7']:.1f}")
-        print(f"🔧 Features shape: {features_df.shape}")
-        print(f"🔧 Data types: {features_df.dtypes.tolist()}")
+        logger.debug("🎯 Creating features for %s", target_date)
+
+        matrix = self._date_feature_matrix([target_date])
+        features = dict(zip(EXACT_FEATURE_COLUMNS, matrix[0]))
+        features_df = self._features_frame(matrix)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📊 Created features using column order: %s", features_df.columns.tolist())
+            logger.debug("🔢 Sample features: year=%d, month=%d, temp=%.1f°C", features['year'], features['month'], features['daily_avg_temp'])
+            logger.debug("📈 AQI context: lag_1=%.1f, ma_7=%.1f", features['aqi_lag_1'], features['aqi_ma_7'])
+            logger.debug("🔧 Features shape: %s", features_df.shape)
+            logger.debug("🔧 Data types: %s", features_df.dtypes.tolist())
         
         return features_df
 
-    def predict_aqi_for_date(self, date, model_name=None):
-        endpoint_caller = "UNKNOWN"
-        import inspect
-        for frame_info in inspect.stack():
-            if 'dashboard' in frame_info.function:
-                endpoint_caller = "DASHBOARD"
-            elif 'prediction' in frame_info.function:
-                endpoint_caller = "PREDICTION"
+    def predict_aqi_for_date(self, date, model_name=None, caller=None):
+        """🎯 SINGLE-DATE AQI PREDICTION
+
+        ``caller`` labels the log lines; when omitted the label set for the
+        current request via ``set_prediction_caller`` is used.
+        """
+        endpoint_caller = caller or prediction_caller.get()
         
-        print(f"🔍 {endpoint_caller} calling predict_aqi_for_date for {date}")
+        logger.debug("🔍 %s calling predict_aqi_for_date for %s", endpoint_caller, date)
+        
+        if self.prediction_table is not None and self.use_trained_models and self.trained_models_loaded:
+            aqi = self.prediction_table.lookup(self._to_datetime(date), self._resolve_model_name(model_name))
+            if aqi is not None:
+                return aqi
+        
+        cache_key = self._cache_key('aqi', date, model_name)
+        cached = self._prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        _, date_str, model_key = cache_key[:3]
+        store_version = self._store_version()
+        if store_version is not None:
+            lags = self._store_lag_keys([date])[0]
+            stored = self.prediction_store.get_aqi(store_version, model_key, date_str, lags)
+            if stored is not None:
+                self._prediction_cache.put(cache_key, stored)
+                return stored
         
         if self.use_trained_models and self.trained_models_loaded:
-            print(f"📊 {endpoint_caller} using TRAINED MODELS")
+            logger.debug("📊 %s using TRAINED MODELS", endpoint_caller)
             aqi = self._predict_with_trained_models(date, model_name)
         else:
-            print(f"🎲 {endpoint_caller} using SIMULATION")
+            logger.debug("🎲 %s using SIMULATION", endpoint_caller)
             aqi = self._predict_with_simulation(date)
         
-        print(f"✅ {endpoint_caller} got AQI: {aqi}")
+        logger.debug("✅ %s got AQI: %s", endpoint_caller, aqi)
+        if aqi is not None:
+            self._prediction_cache.put(cache_key, aqi)
+            if store_version is not None:
+                self.prediction_store.put_aqis(store_version, model_key, [(date_str, lags, aqi)])
         return aqi
 
-    def _predict_with_trained_models(self, date, model_name=None):
-        """🎯 USE YOUR ACTUAL TRAINED MODELS WITH ROBUST ERROR HANDLING"""
-        if not self.trained_models_loaded or not self.trained_models:
-            print("❌ No trained models available")
-            return None
+    def predict_aqi_for_dates(self, dates, model_name=None, caller=None):
+        """📦 BATCH AQI PREDICTION - ONE FEATURE MATRIX, ONE predict() CALL
+
+        Returns a list of AQI values aligned with ``dates``. Entries are None
+        where the trained model could not produce a prediction, mirroring
+        ``predict_aqi_for_date``.
+        """
+        dates = list(dates)
+        if not dates:
+            return []
         
-        # Map API model names to your actual trained model names
-        model_mapping = {
-            'gbr': 'gbr',
-            'gradient_boosting': 'gbr',
-            'rf': 'rf', 
-            'random_forest': 'rf',
-            'et': 'et',
-            'extra_trees': 'et',
-            'xgboost': 'xgboost'
-        }
+        aqis = [None] * len(dates)
+        pending = list(range(len(dates)))
         
-        # Choose model
+        # Dates inside the precomputed window are array lookups
+        table = self.prediction_table
+        if table is not None and self.use_trained_models and self.trained_models_loaded:
+            values = table.predictions.get(self._resolve_model_name(model_name))
+            if values is not None:
+                index = pd.DatetimeIndex(pd.to_datetime([self._to_datetime(d) for d in dates]))
+                positions = table.positions(index)
+                inside = positions >= 0
+                for i, aqi in zip(np.flatnonzero(inside), values[positions[inside]].tolist()):
+                    aqis[i] = aqi
+                pending = np.flatnonzero(~inside).tolist()
+                if not pending:
+                    return aqis
+        
+        cache_keys = {i: self._cache_key('aqi', dates[i], model_name) for i in pending}
+        for i in pending:
+            aqis[i] = self._prediction_cache.get(cache_keys[i])
+        missing = [i for i in pending if aqis[i] is None]
+        if not missing:
+            return aqis
+        
+        # Then the on-disk store shared with other workers and earlier runs
+        store_version = self._store_version()
+        if store_version is not None:
+            model_key = cache_keys[missing[0]][2]
+            lags = dict(zip(missing, self._store_lag_keys([dates[i] for i in missing])))
+            stored = self.prediction_store.get_aqis(store_version, model_key,
+                                                    [(cache_keys[i][1], lags[i]) for i in missing])
+            if stored:
+                for i in missing:
+                    aqi = stored.get(cache_keys[i][1])
+                    if aqi is not None:
+                        aqis[i] = aqi
+                        self._prediction_cache.put(cache_keys[i], aqi)
+                missing = [i for i in missing if aqis[i] is None]
+                if not missing:
+                    return aqis
+        
+        endpoint_caller = caller or prediction_caller.get()
+        missing_dates = [dates[i] for i in missing]
+        if self.use_trained_models and self.trained_models_loaded:
+            logger.debug("📊 %s batch of %s dates using TRAINED MODELS", endpoint_caller, len(missing))
+            predicted = self._predict_batch_parallel(missing_dates, model_name)
+        else:
+            logger.debug("🎲 %s batch of %s dates using SIMULATION", endpoint_caller, len(missing))
+            predicted = [self._predict_with_simulation(date) for date in missing_dates]
+        
+        for i, aqi in zip(missing, predicted):
+            aqis[i] = aqi
+            if aqi is not None:
+                self._prediction_cache.put(cache_keys[i], aqi)
+        if store_version is not None:
+            self.prediction_store.put_aqis(store_version, model_key,
+                                           [(cache_keys[i][1], lags[i], aqis[i]) for i in missing])
+        return aqis
+
+    def resolve_model_name(self, model_name=None):
+        """🔑 LOADED MODEL KEY THAT ``model_name`` WILL BE SERVED BY"""
+        if self.use_trained_models and self.trained_models_loaded:
+            return self._resolve_model_name(model_name)
+        return 'simulation'
+
+    def _resolve_model_name(self, model_name=None):
+        """🔑 MAP API MODEL NAME TO A LOADED MODEL KEY"""
         model_to_use = model_name or self.best_model_name
-        actual_model_name = model_mapping.get(model_to_use, model_to_use)
+        actual_model_name = MODEL_NAME_MAPPING.get(model_to_use, model_to_use)
         
         if actual_model_name not in self.trained_models:
-            print(f"⚠️ Model {actual_model_name} not found. Available: {list(self.trained_models.keys())}")
+            logger.warning("⚠️ Model %s not found. Available: %s", actual_model_name, list(self.trained_models.keys()))
             actual_model_name = list(self.trained_models.keys())[0]  # Use first available
+        return actual_model_name
+
+    def _predict_batch_with_trained_models(self, dates, model_name=None):
+        """🎯 BATCHED VERSION OF _predict_with_trained_models"""
+        if not self.trained_models_loaded or not self.trained_models:
+            logger.error("❌ No trained models available")
+            return [None] * len(dates)
+        
+        actual_model_name = self._resolve_model_name(model_name)
+        
+        try:
+            features_df = self._features_frame(self._date_feature_matrix(dates))
+        except Exception as e:
+            logger.error("❌ Batch feature creation failed: %s", e)
+            return [None] * len(dates)
+        
+        aqis = self._predict_features_with_model(actual_model_name, features_df)
+        return [None] * len(dates) if aqis is None else aqis.tolist()
+
+    def _predict_batch_parallel(self, dates, model_name=None):
+        """🏭 LARGE BATCHES GO TO THE PROCESS POOL IN CHUNKS, SMALL ONES STAY IN-PROCESS"""
+        pool = self.prediction_pool
+        if not pool.should_split(len(dates)) or self.model_path is None:
+            return self._predict_batch_with_trained_models(dates, model_name)
+        try:
+            return pool.predict([self._to_datetime(d) for d in dates], self._resolve_model_name(model_name),
+                                *self._pool_generation(), self.history)
+        except Exception as e:
+            logger.error("❌ Prediction pool failed (%s), scoring in-process", e)
+            return self._predict_batch_with_trained_models(dates, model_name)
+
+    def _pool_generation(self):
+        """(generation, initializer model args) the pool processes must match."""
+        backends = self.get_inference_backends()
+        generation = (self.model_path, self.model_fingerprint, tuple(sorted(backends.items())), self._history_epoch)
+        return generation, (self.model_path, backends)
+
+    def warm_prediction_pool(self):
+        """🏭 START THE POOL PROCESSES NOW SO THE FIRST LARGE BATCH DOES NOT WAIT FOR THEM
+
+        Call once per serving process after it forks (see gunicorn.conf.py
+        post_fork). Returns False when the pool is off or backing off, or no
+        trained models are loaded.
+        """
+        pool = self.prediction_pool
+        if (not pool.should_split(2 * pool.min_chunk) or self.model_path is None
+                or not (self.use_trained_models and self.trained_models_loaded)):
+            return False
+        pool.warm(*self._pool_generation(), self.history)
+        return True
+
+    def _predict_features_with_model(self, actual_model_name, features_df):
+        """🤖 ONE predict() CALL ON A FEATURE FRAME -> int AQI ARRAY (None on failure)"""
+        model = self.trained_models[actual_model_name]
+        try:
+            predictions = self._model_predict(actual_model_name, features_df)
+        except ValueError as ve:
+            logger.error("❌ ValueError in batch prediction: %s", ve)
+            return None
+        except Exception as pred_error:
+            logger.error("❌ Batch prediction error with %s: %s", actual_model_name, pred_error)
+            try:
+                logger.debug("🔄 Trying with minimal features...")
+                minimal_features = features_df[['year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend']].copy()
+                predictions = model.predict(minimal_features)
+            except Exception as minimal_error:
+                logger.error("❌ Even minimal features failed: %s", minimal_error)
+                return None
+        
+        aqis = np.clip(np.round(np.asarray(predictions, dtype=np.float64)), 15, 150).astype(int)
+        logger.debug("🎯 REAL MODEL BATCH: %s predicted %s days", actual_model_name, len(aqis))
+        return aqis
+
+    def load_history(self, path):
+        """📚 LOAD THE OBSERVED AQI HISTORY (.npz) USED FOR LAG FEATURES"""
+        with self._history_lock:
+            signature = _file_signature(path)
+            self.history = AQIHistoryStore.load(path)
+            self.history_path = path
+            self._history_signature = (path, signature)
+            logger.info("📚 AQI history: %s", self.history.describe())
+            self._history_changed()
+            return self.history
+
+    def sync_history(self, path=None):
+        """🔄 CATCH UP WITH THE SHARED HISTORY FILE
+
+        The .npz file is the source of truth for every process serving these
+        models; each one holds its own copy in memory. When the file changed
+        since this process last loaded or saved it, the days past the
+        in-memory end are appended as record_observed_aqi would (only their
+        lag window is re-scored). A file that no longer extends the in-memory
+        series, e.g. one rebuilt with aqi_history.py, is loaded wholesale.
+        Returns the number of days taken from the file.
+        """
+        path = path or self.history_path or HISTORY_PATH
+        with self._history_lock:
+            signature = _file_signature(path)
+            if signature is None or (path, signature) == self._history_signature:
+                return 0
+            stored = AQIHistoryStore.load(path)
+            known = len(self.history)
+            extends = (known > 0 and len(stored) >= known and stored.start == self.history.start
+                       and np.array_equal(stored.values[:known], self.history.values))
+            if not extends:
+                self.load_history(path)
+                return len(stored)
+            first_new = pd.Timestamp(stored.start) + pd.Timedelta(days=known)
+            for offset, aqi in enumerate(stored.values[known:]):
+                self._append_observed(first_new + pd.Timedelta(days=offset), aqi)
+            self.history_path = path
+            self._history_signature = (path, signature)
+            if len(stored) > known:
+                logger.info("🔄 AQI history: %s new day(s) from %s", len(stored) - known, path)
+            return len(stored) - known
+
+    def _history_changed(self):
+        """♻️ HISTORY REPLACED: DROP EVERY PREDICTION MADE WITH THE OLD LAG FEATURES"""
+        self._history_epoch += 1
+        self.history_updated_at = datetime.now(timezone.utc)
+        self._prediction_cache.clear()
+        table = self.prediction_table
+        if table is not None:
+            self.build_prediction_table(pd.Timestamp(table.start), pd.Timestamp(table.end))
+
+    def record_observed_aqi(self, date, aqi, save=True):
+        """📝 APPEND ONE OBSERVED DAY; LAG FEATURES UPDATE IN O(1)
+
+        Only the days whose lag window covers the new observation (the
+        following LAG_WINDOW_DAYS days) can change: their cache entries are
+        dropped and their prediction-table rows re-scored. Everything else
+        stays cached. With ``save`` the day goes through record_observations
+        and so also into the shared history file.
+        """
+        if save:
+            self.record_observations([(date, aqi)])
+            return
+        with self._history_lock:
+            self._append_observed(date, aqi)
+
+    def record_observations(self, observations, path=None):
+        """📝 APPEND OBSERVED DAYS TO THE SHARED HISTORY FILE AND THIS PROCESS
+
+        ``observations`` is [(date, aqi), ...] for consecutive days following
+        the current end. ``<path>.lock`` is held while this process catches
+        up with the file, appends and saves, so appends arriving through
+        different workers are serialized instead of overwriting each other.
+        Other processes take the new days on their next sync_history.
+        Raises ValueError (and records nothing) for a gap or a bad value.
+        """
+        path = path or self.history_path or HISTORY_PATH
+        days = [(pd.Timestamp(self._to_datetime(date)).normalize(), float(aqi)) for date, aqi in observations]
+        for day, aqi in days:
+            if not np.isfinite(aqi) or aqi < 0:
+                raise ValueError(f"Invalid AQI for {day.date()}: {aqi}")
+        if not days:
+            return 0
+        with self._history_lock, _exclusive_file_lock(path + '.lock'):
+            self.sync_history(path)
+            end = self.history.end
+            first = days[0][0] if end is None else pd.Timestamp(end) + pd.Timedelta(days=1)
+            for offset, (day, _) in enumerate(days):
+                expected = first + pd.Timedelta(days=offset)
+                if day != expected:
+                    raise ValueError(f"History is append-only: expected {expected.date()}, got {day.date()}")
+            for day, aqi in days:
+                self._append_observed(day, aqi)
+            self.history.save(path)
+            self.history_path = path
+            self._history_signature = (path, _file_signature(path))
+        return len(days)
+
+    def _append_observed(self, date, aqi):
+        day = pd.Timestamp(self._to_datetime(date)).normalize()
+        self.history.append(day, aqi)
+        self.history_updated_at = datetime.now(timezone.utc)
+        affected = pd.date_range(day + pd.Timedelta(days=1), periods=LAG_WINDOW_DAYS, freq='D')
+        self._prediction_cache.discard_dates(affected.strftime('%Y-%m-%d'))
+        self._refresh_table_rows(affected)
+
+    def _refresh_table_rows(self, index):
+        """🧊 RE-SCORE THE PREDICTION-TABLE ROWS FOR ``index`` WHOSE FEATURES CHANGED"""
+        table = self.prediction_table
+        if table is None:
+            return
+        positions = table.positions(index)
+        inside = positions >= 0
+        if not inside.any():
+            return
+        rows = positions[inside]
+        features = self._compute_feature_matrix(index[inside])
+        changed = ~np.all(features == table.features[rows], axis=1)
+        if not changed.any():
+            return
+        rows, features = rows[changed], features[changed]
+        features_df = self._features_frame(features)
+        for model_key, values in table.predictions.items():
+            aqis = self._predict_features_with_model(model_key, features_df)
+            if aqis is not None:
+                values[rows] = aqis.astype(np.int16)
+        table.features[rows] = features
+
+    def forecast_aqi(self, start_date, days=7, model_name=None):
+        """📆 MULTI-DAY FORECAST ROLLED FORWARD ON ITS OWN PREDICTIONS
+
+        When the history store holds the week before ``start_date``, each
+        day's lag features come from the observed values plus the forecasts
+        already made; otherwise this is ``predict_aqi_for_dates``.
+        """
+        start = self._to_datetime(start_date)
+        dates = [start + timedelta(days=d) for d in range(days)]
+        window = self.history.window_before(start)
+        if window is None or not (self.use_trained_models and self.trained_models_loaded):
+            return self.predict_aqi_for_dates(dates, model_name)
+        
+        cache_key = self._cache_key(f'forecast{days}', start, model_name)
+        cached = self._prediction_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        actual_model_name = self._resolve_model_name(model_name)
+        matrix = self._compute_feature_matrix(pd.DatetimeIndex(dates))
+        forecast = []
+        for i, date in enumerate(dates):
+            matrix[i, 7:14] = window.features()
+            aqis = self._predict_features_with_model(actual_model_name, self._features_frame(matrix[i:i + 1]))
+            aqi = None if aqis is None else int(aqis[0])
+            forecast.append(aqi)
+            observed = self.history.value_on(date)
+            if observed is not None:
+                window.push(observed)
+            elif aqi is not None:
+                window.push(aqi)
+            else:
+                return forecast + self.predict_aqi_for_dates(dates[i + 1:], model_name)
+        
+        self._prediction_cache.put(cache_key, tuple(forecast))
+        return forecast
+
+    def predict_all_models_for_dates(self, dates, model_names=None):
+        """🤝 EVERY MODEL ON ONE SHARED FEATURE MATRIX + R²-WEIGHTED ENSEMBLE
+
+        Returns ``{'models': {key: [aqi, ...]}, 'weights': {key: w},
+        'ensemble': [aqi, ...]}``. Features are built once for all models;
+        models whose predictions are in the precomputed table skip predict().
+        """
+        if not (self.use_trained_models and self.trained_models_loaded):
+            raise RuntimeError("Multi-model prediction needs trained models; none are loaded")
+        dates = [self._to_datetime(d) for d in dates]
+        model_keys = list(dict.fromkeys(self._resolve_model_name(m) for m in (model_names or list(self.trained_models))))
+        
+        table = self.prediction_table
+        positions = None
+        if table is not None and dates:
+            positions = table.positions(pd.DatetimeIndex(dates))
+            if (positions < 0).any():
+                positions = None
+        
+        predictions = {}
+        features_df = None
+        for model_key in model_keys:
+            if positions is not None and model_key in table.predictions:
+                predictions[model_key] = table.predictions[model_key][positions].astype(int).tolist()
+                continue
+            if features_df is None:
+                features_df = self._features_frame(self._date_feature_matrix(dates))
+            aqis = self._predict_features_with_model(model_key, features_df) if dates else np.empty(0, dtype=int)
+            predictions[model_key] = [None] * len(dates) if aqis is None else aqis.tolist()
+        
+        weights = ensemble_weights(self.model_performances, model_keys)
+        return {'models': predictions, 'weights': weights, 'ensemble': weighted_ensemble(predictions, weights)}
+
+    def forecast_all_models(self, start_date, days=7, model_names=None):
+        """📆 forecast_aqi FOR EVERY MODEL + R²-WEIGHTED ENSEMBLE (same shape as predict_all_models_for_dates)"""
+        start = self._to_datetime(start_date)
+        if self.history.window_before(start) is None:
+            return self.predict_all_models_for_dates([start + timedelta(days=d) for d in range(days)], model_names)
+        # Rolled forecasts feed each model its own predictions, so they cannot share features
+        model_keys = list(dict.fromkeys(self._resolve_model_name(m) for m in (model_names or list(self.trained_models))))
+        predictions = {key: self.forecast_aqi(start, days, key) for key in model_keys}
+        weights = ensemble_weights(self.model_performances, model_keys)
+        return {'models': predictions, 'weights': weights, 'ensemble': weighted_ensemble(predictions, weights)}
+
+    def build_prediction_table(self, start, end):
+        """🧊 PRECOMPUTE FEATURES AND EVERY MODEL'S AQI FOR [start, end]"""
+        started = time.perf_counter()
+        index = pd.date_range(self._to_datetime(start), self._to_datetime(end), freq='D')
+        features = self._compute_feature_matrix(index)
+        features_df = self._features_frame(features)
+        
+        predictions = {}
+        for model_key in self._loaded_model_keys():
+            aqis = self._predict_features_with_model(model_key, features_df)
+            if aqis is not None:
+                predictions[model_key] = aqis.astype(np.int16)
+        
+        table = PredictionTable(index[0], features, predictions, time.perf_counter() - started)
+        self.prediction_table = table
+        logger.info("🧊 Precomputed %s..%s: %d days x %d models in %.2fs (%.1f KB)",
+                    table.start, table.end, len(table), len(predictions),
+                    table.build_seconds, table.nbytes() / 1024)
+        return table
+
+    def score_dates(self, dates, model_names=None, overrides=None):
+        """📑 OFFLINE SCORING: {model_key: int16 AQI array} FOR A BATCH OF DATES
+
+        ``overrides`` maps feature columns (e.g. ``daily_avg_temp`` or the
+        lag columns) to arrays of real values; NaN entries keep the generated
+        feature. Bypasses the prediction cache and table so memory does not
+        grow with the number of dates scored.
+        """
+        if not (self.use_trained_models and self.trained_models_loaded):
+            raise RuntimeError("score_dates needs trained models; none are loaded")
+        index = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        matrix = self._compute_feature_matrix(index)
+        for column, values in (overrides or {}).items():
+            if column not in EXACT_FEATURE_COLUMNS:
+                raise KeyError(f"Unknown feature column: {column}")
+            values = np.asarray(values, dtype=np.float64)
+            known = ~np.isnan(values)
+            matrix[known, EXACT_FEATURE_COLUMNS.index(column)] = values[known]
+        features_df = self._features_frame(matrix)
+
+        scores = {}
+        for model_name in (model_names or list(self.trained_models)):
+            model_key = self._resolve_model_name(model_name)
+            if len(index) == 0:
+                aqis = np.empty(0, dtype=int)
+            else:
+                aqis = self._predict_features_with_model(model_key, features_df)
+            if aqis is None:
+                raise RuntimeError(f"Model {model_key} failed to score {len(index)} dates")
+            scores[model_key] = aqis.astype(np.int16)
+        return scores
+
+    def _predict_with_trained_models(self, date, model_name=None):
+        """🎯 USE YOUR ACTUAL TRAINED MODELS WITH ROBUST ERROR HANDLING"""
+        if not self.trained_models_loaded or not self.trained_models:
+            logger.error("❌ No trained models available")
+            return None
+        
+        actual_model_name = self._resolve_model_name(model_name)
         
         try:
             # Get the model
             model = self.trained_models[actual_model_name]
-            print(f"🤖 Using model: {actual_model_name} ({type(model).__name__})")
+            logger.debug("🤖 Using model: %s (%s)", actual_model_name, type(model).__name__)
             
             # Create features
             features_df = self._create_features_for_date(date)
             
-            print(f"🔧 Features info:")
-            print(f"   Shape: {features_df.shape}")
-            print(f"   Columns: {features_df.columns.tolist()}")
-            print(f"   Data types: {features_df.dtypes.tolist()}")
-            print(f"   Has NaN: {features_df.isnull().any().any()}")
-            print(f"   Sample values: {features_df.iloc[0].tolist()[:5]}")  # Show first 5 values
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔧 Features info:")
+                logger.debug("   Shape: %s", features_df.shape)
+                logger.debug("   Columns: %s", features_df.columns.tolist())
+                logger.debug("   Data types: %s", features_df.dtypes.tolist())
+                logger.debug("   Has NaN: %s", features_df.isnull().any().any())
+                logger.debug("   Sample values: %s", features_df.iloc[0].tolist()[:5])  # Show first 5 values
             
             # ✅ CRITICAL FIX: Final data validation
             if features_df.isnull().any().any():
-                print("⚠️ Found NaN values, filling with 0.0...")
+                logger.warning("⚠️ Found NaN values, filling with 0.0...")
                 features_df = features_df.fillna(0.0)
             
             # ✅ CRITICAL FIX: Ensure all data is float64
@@ -480,44 +1781,40 @@ class AQIPredictionSystem:
             
             # Try prediction with comprehensive error handling
             try:
-                prediction = model.predict(features_df)[0]
-                print(f"✅ Raw prediction: {prediction} (type: {type(prediction)})")
+                prediction = self._model_predict(actual_model_name, features_df)[0]
+                logger.debug("✅ Raw prediction: %s (type: %s)", prediction, type(prediction))
                 
                 # Convert to float and ensure reasonable bounds
                 aqi = max(15, min(150, round(float(prediction))))
                 
-                print(f"🎯 REAL MODEL SUCCESS: {actual_model_name} predicted AQI {aqi}")
+                logger.debug("🎯 REAL MODEL SUCCESS: %s predicted AQI %s", actual_model_name, aqi)
                 return aqi
                 
             except ValueError as ve:
-                print(f"❌ ValueError in prediction: {ve}")
-                print(f"❌ Features DataFrame info:")
-                print(features_df.info())
+                logger.error("❌ ValueError in prediction: %s", ve)
+                logger.error("❌ Features DataFrame dtypes: %s", features_df.dtypes.to_dict())
                 return None
                 
             except Exception as pred_error:
-                print(f"❌ Prediction error with {actual_model_name}: {pred_error}")
-                print(f"❌ Error type: {type(pred_error).__name__}")
+                logger.error("❌ Prediction error with %s: %s", actual_model_name, pred_error)
+                logger.error("❌ Error type: %s", type(pred_error).__name__)
                 
                 # ✅ FALLBACK: Try with minimal features if full prediction fails
                 try:
-                    print("🔄 Trying with minimal features...")
+                    logger.debug("🔄 Trying with minimal features...")
                     minimal_features = features_df[['year', 'month', 'day', 'weekday', 'day_of_year', 'is_weekend']].copy()
                     prediction = model.predict(minimal_features)[0]
                     aqi = max(15, min(150, round(float(prediction))))
                     
-                    print(f"🎯 MINIMAL FEATURES SUCCESS: AQI {aqi}")
+                    logger.debug("🎯 MINIMAL FEATURES SUCCESS: AQI %s", aqi)
                     return aqi
                     
                 except Exception as minimal_error:
-                    print(f"❌ Even minimal features failed: {minimal_error}")
+                    logger.error("❌ Even minimal features failed: %s", minimal_error)
                     return None
                     
         except Exception as e:
-            print(f"❌ Model {actual_model_name} completely failed: {e}")
-            print(f"❌ Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Model %s completely failed (%s): %s", actual_model_name, type(e).__name__, e)
             return None
 
     def _predict_with_simulation(self, date, model_name=None):
@@ -532,8 +1829,7 @@ class AQIPredictionSystem:
         else:
             seed_string = date_str
             
-        date_seed = self._get_date_seed_with_model(date, model_name)
-        np.random.seed(date_seed)
+        rng = np.random.default_rng(self._get_date_seed_with_model(date, model_name))
         
         # Proper AQI calculation with realistic ranges
         day_of_year = date.timetuple().tm_yday
@@ -543,19 +1839,19 @@ class AQIPredictionSystem:
         
         # Model-specific variations
         if model_name == 'gbr':
-            daily_variation = np.random.normal(0, 8)    # Best model - low variance
+            daily_variation = rng.normal(0, 8)    # Best model - low variance
             bias = 0
         elif model_name == 'rf':
-            daily_variation = np.random.normal(0, 12)   # Good model
+            daily_variation = rng.normal(0, 12)   # Good model
             bias = -3
         elif model_name == 'et':
-            daily_variation = np.random.normal(0, 18)   # Fair model
+            daily_variation = rng.normal(0, 18)   # Fair model
             bias = +4
         elif model_name == 'xgboost':
-            daily_variation = np.random.normal(0, 25)   # Worst model - high variance
+            daily_variation = rng.normal(0, 25)   # Worst model - high variance
             bias = +8
         else:
-            daily_variation = np.random.normal(0, 15)   # Default
+            daily_variation = rng.normal(0, 15)   # Default
             bias = 0
         
         # Calculate final AQI
@@ -564,7 +1860,6 @@ class AQIPredictionSystem:
         # Proper bounds (15-150)
         aqi = max(15, min(150, aqi))
         
-        np.random.seed(None)
         return round(aqi)
 
     def _get_date_seed_with_model(self, date, model_name):
@@ -594,66 +1889,65 @@ class AQIPredictionSystem:
         else:
             return "🎲 Mathematical Simulation"
 
-    def get_main_pollutant_for_date(self, date):
-        """🌪️ ENHANCED POLLUTANT SELECTION"""
+    def get_main_pollutant_for_date(self, date, aqi=None):
+        """🌪️ POLLUTANT WITH THE HIGHEST EPA SUB-INDEX (pass ``aqi`` to reuse a prediction)"""
         if isinstance(date, str):
             date = datetime.strptime(date, '%Y-%m-%d')
         
-        month = date.month
-        aqi = self.predict_aqi_for_date(date)
+        if aqi is None:
+            aqi = self.predict_aqi_for_date(date)
         
-        # Seasonal pollutant patterns
-        if month in [11, 12, 1, 2]:  # Winter
-            if aqi > 100:
-                return "PM2.5 - Winter Pollution"
-            elif aqi > 70:
-                return "PM10 Total 0-10um STP"
-            else:
-                return "PM2.5 - Local Conditions"
-        elif month in [3, 4, 5]:  # Summer
-            if aqi > 80:
-                return "PM10 Total 0-10um STP"
-            elif aqi > 60:
-                return "Ozone"
-            else:
-                return "PM2.5 - Local Conditions"
-        elif month in [6, 7, 8, 9]:  # Monsoon
-            if aqi > 90:
-                return "PM2.5 - Humid Conditions"
-            else:
-                return "Nitrogen dioxide (NO2)"
-        else:  # Post-monsoon
-            if aqi > 90:
-                return "PM2.5 - Crop Burning"
-            elif aqi > 60:
-                return "PM10 Total 0-10um STP"
-            else:
-                return "Nitrogen dioxide (NO2)"
+        # Dominant EPA sub-index of the concentrations behind this AQI
+        concentrations = self.predict_pollutant_concentrations(date, aqi=aqi)
+        return self.breakpoint_engine.dominant_concentration(concentrations)
 
-    def predict_pollutant_concentrations(self, date, model_name=None):
-        """🌪️ ENHANCED POLLUTANT CONCENTRATIONS"""
-        aqi = self.predict_aqi_for_date(date, model_name)
+    def predict_pollutant_concentrations(self, date, model_name=None, aqi=None):
+        """🌪️ POLLUTANT CONCENTRATIONS WHOSE DOMINANT SUB-INDEX IS THE PREDICTED AQI
+
+        The seasonal mix sets each pollutant's share; the breakpoint engine
+        rescales the sub-indices so the highest equals ``aqi``. The cache key
+        includes the AQI, so a caller-supplied ``aqi`` never gets (or leaves
+        behind) concentrations scaled to a different one.
+        """
+        if aqi is None:
+            aqi = self.predict_aqi_for_date(date, model_name)
+        cache_key = self._cache_key('concentrations', date, model_name) + (aqi,)
+        cached = self._prediction_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        _, date_str, model_key = cache_key[:3]
+        store_version = self._store_version()
+        if store_version is not None:
+            stored = self.prediction_store.get_concentrations(store_version, model_key, date_str, aqi)
+            if stored is not None:
+                self._prediction_cache.put(cache_key, dict(stored))
+                return stored
         
+        started = time.perf_counter()
         if isinstance(date, str):
             date = datetime.strptime(date, '%Y-%m-%d')
         
-        date_seed = self._get_date_seed(date)
-        np.random.seed(date_seed)
+        rng = np.random.default_rng(self._get_date_seed(date))
         
         day_of_year = date.timetuple().tm_yday
         seasonal_factor = np.sin(day_of_year * 2 * np.pi / 365)
         aqi_scale = aqi / 50.0
         
         concentrations = {
-            'PM2.5 - Local Conditions': max(5, (15 + 8 * seasonal_factor) * aqi_scale + np.random.normal(0, 3)),
-            'PM10 Total 0-10um STP': max(10, (25 + 12 * seasonal_factor) * aqi_scale + np.random.normal(0, 5)),
-            'Carbon monoxide': max(0.1, (0.8 + 0.3 * seasonal_factor) * aqi_scale + np.random.normal(0, 0.2)),
-            'Nitrogen dioxide (NO2)': max(0.005, (0.020 + 0.008 * seasonal_factor) * aqi_scale + np.random.normal(0, 0.005)),
-            'Sulfur dioxide': max(0.002, (0.010 + 0.004 * seasonal_factor) * aqi_scale + np.random.normal(0, 0.003)),
-            'Ozone': max(0.020, (0.040 + 0.012 * abs(seasonal_factor)) * aqi_scale + np.random.normal(0, 0.008))
+            'PM2.5 - Local Conditions': max(5, (15 + 8 * seasonal_factor) * aqi_scale + rng.normal(0, 3)),
+            'PM10 Total 0-10um STP': max(10, (25 + 12 * seasonal_factor) * aqi_scale + rng.normal(0, 5)),
+            'Carbon monoxide': max(0.1, (0.8 + 0.3 * seasonal_factor) * aqi_scale + rng.normal(0, 0.2)),
+            'Nitrogen dioxide (NO2)': max(0.005, (0.020 + 0.008 * seasonal_factor) * aqi_scale + rng.normal(0, 0.005)),
+            'Sulfur dioxide': max(0.002, (0.010 + 0.004 * seasonal_factor) * aqi_scale + rng.normal(0, 0.003)),
+            'Ozone': max(0.020, (0.040 + 0.012 * abs(seasonal_factor)) * aqi_scale + rng.normal(0, 0.008))
         }
+        concentrations = self.breakpoint_engine.scale_concentrations_to_aqi(concentrations, aqi)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='pollutant_derivation')
         
-        np.random.seed(None)
+        self._prediction_cache.put(cache_key, dict(concentrations))
+        if store_version is not None:
+            self.prediction_store.put_concentrations(store_version, model_key, date_str, aqi, concentrations)
         return concentrations
 
     def _get_date_seed(self, date):
@@ -661,55 +1955,84 @@ class AQIPredictionSystem:
         date_str = date.strftime('%Y-%m-%d')
         return int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
 
-    def get_highest_concentration_days(self, year, month):
-        """🏆 ENHANCED HIGHEST CONCENTRATION DAYS"""
-        from calendar import monthrange
-        _, num_days = monthrange(year, month)
-        
-        pollutant_peaks = {}
-        pollutants_info = [
-            ('PM2.5 - Local Conditions', 'µg/m³', 35, 12),
-            ('Ozone', 'ppb', 65, 15), 
-            ('Nitrogen dioxide (NO2)', 'ppb', 28, 10),
-            ('Sulfur dioxide', 'ppb', 18, 6),
-            ('Carbon monoxide', 'ppm', 1.2, 0.4)
-        ]
-
-        for i, (pollutant, unit, base, std) in enumerate(pollutants_info):
+    HIGHEST_CONCENTRATION_POLLUTANTS = [
+        ('PM2.5 - Local Conditions', 'µg/m³', 35, 12),
+        ('Ozone', 'ppb', 65, 15),
+        ('Nitrogen dioxide (NO2)', 'ppb', 28, 10),
+        ('Sulfur dioxide', 'ppb', 18, 6),
+        ('Carbon monoxide', 'ppm', 1.2, 0.4)
+    ]
+
+    def get_highest_concentration_days(self, year=None, month=None, start_date=None, end_date=None):
+        """🏆 ENHANCED HIGHEST CONCENTRATION DAYS
+
+        Pass ``year, month`` for one month or ``start_date, end_date``
+        (inclusive) for any range, e.g. a whole year. The AQI for every day is
+        predicted once in a single batch; peaks and concentrations for all
+        pollutants are computed on NumPy arrays.
+        """
+        if start_date is not None or end_date is not None:
+            if start_date is None or end_date is None:
+                raise ValueError("start_date and end_date must be given together")
+            start = self._to_datetime(start_date).replace(hour=0, minute=0, second=0, microsecond=0)
+            end = self._to_datetime(end_date).replace(hour=0, minute=0, second=0, microsecond=0)
+            if end < start:
+                raise ValueError(f"end_date {end:%Y-%m-%d} is before start_date {start:%Y-%m-%d}")
+            seed_label = f"{start:%Y-%m-%d}..{end:%Y-%m-%d}"
+        elif year is not None and month is not None:
+            from calendar import monthrange
+            _, num_days = monthrange(year, month)
+            start = datetime(year, month, 1)
+            end = datetime(year, month, num_days)
+            seed_label = f"{year:04d}-{month:02d}"
+        else:
+            raise ValueError("Pass year and month, or start_date and end_date")
+
+        dates = list(pd.date_range(start, end, freq='D').to_pydatetime())
+        try:
+            predicted = self.predict_aqi_for_dates(dates)
+        except Exception:
+            logger.exception("❌ Batch prediction failed for %s", seed_label)
+            predicted = [None] * len(dates)
+        # Days without a prediction never win, as before
+        aqis = np.array([np.nan if aqi is None else aqi for aqi in predicted], dtype=np.float64)
+
+        # Running-max records: one noise draw per new maximum, the last one is the peak's
+        running_max = np.fmax.accumulate(np.concatenate(([0.0], aqis)))
+        is_record = aqis > running_max[:-1]
+        n_records = int(np.count_nonzero(is_record))
+
+        pollutants = self.HIGHEST_CONCENTRATION_POLLUTANTS
+        bases = np.array([base for _, _, base, _ in pollutants], dtype=np.float64)
+        ppm = np.array([unit == 'ppm' for _, unit, _, _ in pollutants])
+
+        if n_records:
+            peak_index = int(np.flatnonzero(is_record)[-1])
+            peak_date = dates[peak_index]
+            highest_aqi = predicted[peak_index]
+            noise = np.array([
+                np.random.default_rng(
+                    int(hashlib.md5(f"{seed_label}-{pollutant}".encode()).hexdigest()[:8], 16)
+                ).normal(0, std * 0.3, size=n_records)[-1]
+                for pollutant, _, _, std in pollutants
+            ])
+            concentrations = bases * (highest_aqi / 50.0) + noise
+            concentrations = np.where(ppm, np.clip(concentrations, 0.2, 3.0), np.clip(concentrations, 5, 100))
+        else:
+            peak_date = dates[0]
             highest_aqi = 0
-            peak_day = 1
-            peak_concentration = base
-            
-            for day in range(1, num_days + 1):
-                try:
-                    test_date = datetime(year, month, day)
-                    daily_aqi = self.predict_aqi_for_date(test_date)
-                    
-                    if daily_aqi > highest_aqi:
-                        highest_aqi = daily_aqi
-                        peak_day = day
-                        
-                        aqi_scale = daily_aqi / 50.0
-                        concentration = base * aqi_scale + np.random.normal(0, std * 0.3)
-                        
-                        if unit == 'ppm':
-                            concentration = max(0.2, min(3.0, concentration))
-                        else:
-                            concentration = max(5, min(100, concentration))
-                        
-                        peak_concentration = concentration
-                        
-                except:
-                    continue
-            
-            pollutant_peaks[pollutant] = {
-                'day': peak_day,
-                'concentration': round(peak_concentration, 1),
+            concentrations = bases
+
+        return {
+            pollutant: {
+                'day': peak_date.day,
+                'date': peak_date.strftime('%Y-%m-%d'),
+                'concentration': round(float(concentration), 1),
                 'unit': unit,
                 'aqi': highest_aqi
             }
-        
-        return pollutant_peaks
+            for (pollutant, unit, _, _), concentration in zip(pollutants, concentrations)
+        }
 
 # Test system on initialization
 if __name__ == "__main__":
@@ -718,7 +2041,7 @@ if __name__ == "__main__":
     aqi_system = AQIPredictionSystem()
     
     # Try to load models
-    success = aqi_system.load_models('aqi_4_models.pkl')
+    success = aqi_system.load_models(default_model_path())
     
     if success:
         print(f"\n🎯 SYSTEM STATUS:")
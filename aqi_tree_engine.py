@@ -0,0 +1,122 @@
+"""
+AirSight tree engine - pure-NumPy inference for fitted sklearn tree ensembles
+
+sklearn's predict() spends most of its time on input validation and per-call
+setup when scoring a handful of rows. ``compile_ensemble`` copies the fitted
+trees of a RandomForest / ExtraTrees / GradientBoosting / DecisionTree
+regressor into flat contiguous arrays (feature, threshold, left, right,
+value) and ``CompiledTreeEnsemble.predict`` walks every tree for every row at
+once with vectorized NumPy indexing. Anything else (pipelines, HistGradient-
+Boosting, xgboost, ...) is reported as unsupported so callers keep sklearn.
+"""
+
+import numpy as np
+
+TREE_LEAF = -1
+
+
+class UnsupportedModelError(TypeError):
+    """The estimator cannot be compiled; keep using its own predict()."""
+
+
+class CompiledTreeEnsemble:
+    """🌲 FLAT-ARRAY TREE ENSEMBLE: prediction = init + scale * combine(leaf values)"""
+
+    def __init__(self, trees, n_features, init=0.0, scale=1.0, average=False, source=''):
+        offsets = np.cumsum([0] + [len(t['feature']) for t in trees[:-1]])
+        self.roots = offsets.astype(np.int64)
+        self.feature = np.concatenate([t['feature'] for t in trees]).astype(np.int64)
+        self.threshold = np.concatenate([t['threshold'] for t in trees]).astype(np.float64)
+        self.left = np.concatenate([np.where(t['left'] == TREE_LEAF, TREE_LEAF, t['left'] + off)
+                                    for t, off in zip(trees, offsets)]).astype(np.int64)
+        self.right = np.concatenate([np.where(t['right'] == TREE_LEAF, TREE_LEAF, t['right'] + off)
+                                     for t, off in zip(trees, offsets)]).astype(np.int64)
+        self.value = np.concatenate([t['value'] for t in trees]).astype(np.float64)
+        # Leaves point at themselves so finished rows stay put while others descend
+        is_leaf = self.left == TREE_LEAF
+        node_ids = np.arange(len(self.feature), dtype=np.int64)
+        self.left = np.where(is_leaf, node_ids, self.left)
+        self.right = np.where(is_leaf, node_ids, self.right)
+        self.feature = np.where(is_leaf, 0, self.feature)
+        self.max_depth = max(t['depth'] for t in trees)
+        self.n_features = n_features
+        self.init = float(init)
+        self.scale = float(scale)
+        self.average = average
+        self.source = source
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.roots, self.feature, self.threshold,
+                                      self.left, self.right, self.value))
+
+    def predict(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected (n, {self.n_features}) features, got {X.shape}")
+        # sklearn compares float32 inputs against float64 thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaf_values = self.value[nodes]
+        combined = leaf_values.mean(axis=1) if self.average else leaf_values.sum(axis=1)
+        return self.init + self.scale * combined
+
+
+def _flatten_tree(estimator):
+    tree = estimator.tree_
+    if tree.n_outputs != 1:
+        raise UnsupportedModelError("Only single-output trees are supported")
+    return {
+        'feature': tree.feature,
+        'threshold': tree.threshold,
+        'left': tree.children_left,
+        'right': tree.children_right,
+        'value': tree.value[:, 0, 0],
+        'depth': tree.max_depth
+    }
+
+
+def compile_ensemble(model):
+    """🛠️ COMPILE A FITTED sklearn TREE REGRESSOR (raises UnsupportedModelError)"""
+    name = type(model).__name__
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is None:
+        raise UnsupportedModelError(f"{name} is not fitted or not a tree model")
+
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        trees = [_flatten_tree(est) for est in model.estimators_]
+        return CompiledTreeEnsemble(trees, n_features, average=True, source=name)
+
+    if name in ('DecisionTreeRegressor', 'ExtraTreeRegressor'):
+        return CompiledTreeEnsemble([_flatten_tree(model)], n_features, source=name)
+
+    if name == 'GradientBoostingRegressor':
+        init = model.init_
+        if init == 'zero':
+            init_value = 0.0
+        elif hasattr(init, 'constant_') and np.size(init.constant_) == 1:
+            init_value = float(np.ravel(init.constant_)[0])
+        else:
+            raise UnsupportedModelError(f"GradientBoostingRegressor init {type(init).__name__} is not supported")
+        trees = [_flatten_tree(est) for est in model.estimators_[:, 0]]
+        return CompiledTreeEnsemble(trees, n_features, init=init_value,
+                                    scale=model.learning_rate, source=name)
+
+    raise UnsupportedModelError(f"{name} is not a supported tree ensemble")
+
+
+def verify_against_model(compiled, model, X, atol=1e-6):
+    """✅ MAX |compiled - sklearn| ON X; raises ValueError if above ``atol``"""
+    expected = np.asarray(model.predict(X), dtype=np.float64).ravel()
+    actual = compiled.predict(np.asarray(X, dtype=np.float64))
+    max_error = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if max_error > atol:
+        raise ValueError(f"Compiled {compiled.source} differs from sklearn by {max_error:.3g}")
+    return max_error
@@ -0,0 +1,180 @@
+"""
+AirSight ASGI entry point - async serving mode for the Flask API
+
+    uvicorn asgi_app:app --port 8000
+    AQI_SERVER_MODE=asgi gunicorn -c gunicorn.conf.py
+
+The Flask app in flask_api_backend stays a plain WSGI app. This adapter runs
+it under an asyncio server: every request except /api/health and
+/api/metrics - prediction endpoints and static files alike, since file reads
+and response compression block too - is executed on a bounded thread pool,
+so the event loop itself never waits on one. A slow yearly chart therefore
+occupies one executor thread instead of a whole worker, and health checks
+keep flowing. When more than AQI_ASGI_MAX_PENDING prediction (/api/*)
+requests are queued, new ones get 503 + Retry-After instead of piling up;
+static files are never shed.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_api_backend import app as flask_app
+
+# Threads running prediction requests (NumPy/sklearn release the GIL for most of the work)
+ASGI_THREADS = int(os.environ.get('AQI_ASGI_THREADS', str(min(4, os.cpu_count() or 1))))
+# Prediction requests admitted (running + queued) before answering 503
+ASGI_MAX_PENDING = int(os.environ.get('AQI_ASGI_MAX_PENDING', '64'))
+
+# Paths answered on the event loop; everything else is offloaded
+INLINE_API_PATHS = {'/api/health', '/api/metrics'}
+
+
+def is_offloaded(path):
+    return path not in INLINE_API_PATHS
+
+
+def is_admission_limited(path):
+    """Prediction requests count against AQI_ASGI_MAX_PENDING; static files do not."""
+    return path.startswith('/api/')
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI http scope (PEP 3333 strings are latin-1 decoded bytes)."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion: (status_code, [(name, value)], body bytes)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return lambda data: chunks.append(data)
+
+    chunks = []
+    result = wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+class AsyncWSGIAdapter:
+    """⚡ ASGI APP THAT RUNS A WSGI APP INLINE OR ON A BOUNDED EXECUTOR PER PATH"""
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, max_pending=ASGI_MAX_PENDING, offload=is_offloaded,
+                 limit=is_admission_limited):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.max_pending = max_pending
+        self.offload = offload
+        self.limit = limit
+        self.executor = None
+        self.pending = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._start_executor()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _start_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='aqi-asgi')
+        return self.executor
+
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        environ = build_environ(scope, bytes(body))
+
+        limited = self.limit(scope['path'])
+        if not self.offload(scope['path']):
+            status, headers, payload = call_wsgi(self.wsgi_app, environ)
+        elif limited and self.pending >= self.max_pending:
+            status, headers, payload = 503, [('Content-Type', 'application/json'), ('Retry-After', '1')], \
+                b'{"error": "Server busy, retry shortly"}'
+        else:
+            self.pending += limited
+            try:
+                loop = asyncio.get_running_loop()
+                status, headers, payload = await loop.run_in_executor(
+                    self._start_executor(), call_wsgi, self.wsgi_app, environ)
+            finally:
+                self.pending -= limited
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+    def stats(self):
+        return {'threads': self.threads, 'max_pending': self.max_pending, 'pending': self.pending}
+
+
+app = AsyncWSGIAdapter(flask_app)
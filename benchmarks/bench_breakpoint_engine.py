@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: EPA sub-index throughput of the vectorized breakpoint engine.
+
+Scores random readings for all six pollutants with BreakpointEngine.evaluate
+(sub-indices, AQI and dominant pollutant) and compares against a per-reading
+Python loop over the same breakpoint tables. Run from the repo root:
+
+    python benchmarks/bench_breakpoint_engine.py [--readings 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aqi_prediction_system import AQIPredictionSystem
+
+# Upper end of each random range, in breakpoint units
+READING_RANGES = {'PM2.5': 250.0, 'PM10': 420.0, 'CO': 30.0, 'SO2': 600.0, 'NO2': 1200.0, 'O3': 0.2}
+
+
+def scalar_sub_index(rows, concentration):
+    """Straightforward per-reading lookup, kept here only for comparison."""
+    for c_lo, c_hi, i_lo, i_hi in rows:
+        if concentration <= c_hi:
+            return (i_hi - i_lo) / (c_hi - c_lo) * (concentration - c_lo) + i_lo
+    c_lo, c_hi, i_lo, i_hi = rows[-1]
+    return (i_hi - i_lo) / (c_hi - c_lo) * (concentration - c_lo) + i_lo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=1_000_000, help='readings per pollutant')
+    parser.add_argument('--scalar-readings', type=int, default=20_000, help='readings for the Python loop')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    system = AQIPredictionSystem()
+    engine = system.breakpoint_engine
+    rng = np.random.default_rng(0)
+    readings = {p: rng.uniform(0, READING_RANGES[p], args.readings) for p in engine.pollutants}
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        _, aqi, dominant = engine.evaluate(readings)
+        best = min(best, time.perf_counter() - start)
+    total = args.readings * len(readings)
+    print(f"vectorized: {args.readings:,} rows x {len(readings)} pollutants in {best * 1000:.1f} ms "
+          f"-> {total / best / 1e6:.1f}M readings/s")
+
+    start = time.perf_counter()
+    for pollutant, values in readings.items():
+        rows = system.breakpoints[pollutant]
+        for concentration in values[:args.scalar_readings]:
+            scalar_sub_index(rows, concentration)
+    elapsed = time.perf_counter() - start
+    scalar_rate = args.scalar_readings * len(readings) / elapsed
+    print(f"python loop: {scalar_rate / 1e6:.2f}M readings/s (vectorized is {total / best / scalar_rate:.0f}x faster)")
+
+    values, counts = np.unique(dominant, return_counts=True)
+    print("dominant share:", {str(v): f"{c / len(dominant):.1%}" for v, c in zip(values, counts)})
+    print(f"mean AQI: {np.nanmean(aqi):.1f}")
+
+
+if __name__ == '__main__':
+    main()
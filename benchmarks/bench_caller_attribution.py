@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: cost of labelling a prediction with its calling endpoint.
+
+Compares the old inspect.stack() sniffing that predict_aqi_for_date used to do
+on every call with the contextvar lookup that replaced it. Run from the repo
+root:
+
+    python benchmarks/bench_caller_attribution.py [--calls 2000] [--depth 20]
+"""
+
+import argparse
+import inspect
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aqi_prediction_system import prediction_caller, set_prediction_caller, reset_prediction_caller
+
+
+def sniff_caller_with_stack():
+    """The pre-contextvar implementation, kept here only for comparison."""
+    endpoint_caller = "UNKNOWN"
+    for frame_info in inspect.stack():
+        if 'dashboard' in frame_info.function:
+            endpoint_caller = "DASHBOARD"
+        elif 'prediction' in frame_info.function:
+            endpoint_caller = "PREDICTION"
+    return endpoint_caller
+
+
+def lookup_caller_with_contextvar():
+    return prediction_caller.get()
+
+
+def _at_depth(depth, fn):
+    """Call ``fn`` under ``depth`` extra frames, roughly what a Flask request adds."""
+    if depth <= 0:
+        return fn()
+    return _at_depth(depth - 1, fn)
+
+
+def get_dashboard_data(depth, fn):
+    return _at_depth(depth, fn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=20, help='extra stack frames above the call')
+    args = parser.parse_args()
+
+    token = set_prediction_caller('DASHBOARD')
+    try:
+        assert get_dashboard_data(args.depth, sniff_caller_with_stack) == 'DASHBOARD'
+        assert get_dashboard_data(args.depth, lookup_caller_with_contextvar) == 'DASHBOARD'
+
+        results = {}
+        for name, fn in [('inspect.stack', sniff_caller_with_stack),
+                         ('contextvar', lookup_caller_with_contextvar)]:
+            seconds = min(timeit.repeat(lambda: get_dashboard_data(args.depth, fn),
+                                        number=args.calls, repeat=3))
+            results[name] = seconds / args.calls * 1e6
+    finally:
+        reset_prediction_caller(token)
+
+    print(f"Caller attribution overhead ({args.calls} calls, stack depth +{args.depth}):")
+    for name, usec in results.items():
+        print(f"  {name:<14} {usec:10.2f} µs/call")
+    print(f"  speedup        {results['inspect.stack'] / results['contextvar']:10.0f}x")
+    print(f"  per 365-day chart: {results['inspect.stack'] * 365 / 1000:.1f} ms -> "
+          f"{results['contextvar'] * 365 / 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
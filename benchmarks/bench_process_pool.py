@@ -0,0 +1,71 @@
+"""
+Benchmark: multi-core scaling of the prediction process pool.
+
+Scores uncached 365-day and 10-year date ranges for every model with
+AQI_PREDICTION_PROCESSES = 1 (in the calling process) up to N, and prints
+wall time and speedup. The pool is warmed up (models loaded in every
+process) before timing. Run from the repo root:
+
+    python benchmarks/bench_process_pool.py [--model-path aqi_4_models.pkl] [--max-processes 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aqi_prediction_system import AQIPredictionSystem, configure_logging, default_model_path
+
+RANGES = {'365 days': ('2030-01-01', '2030-12-31'), '10 years': ('2030-01-01', '2039-12-31')}
+
+
+def time_range(system, dates, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        system._prediction_cache.clear()
+        started = time.perf_counter()
+        for model_key in list(system.trained_models):
+            system.predict_aqi_for_dates(dates, model_key)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-path', default=None)
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    configure_logging('WARNING')
+    system = AQIPredictionSystem()
+    system.load_models(args.model_path or default_model_path(), precompute_years=0)
+    if not system.trained_models_loaded:
+        sys.exit("❌ Trained models are required for this benchmark")
+    models = list(system.trained_models)
+    print(f"{len(models)} models ({', '.join(models)}), {os.cpu_count()} CPUs")
+
+    process_counts = sorted({1, 2, 4, args.max_processes} & set(range(1, args.max_processes + 1)))
+    baseline = {}
+    print(f"{'processes':>9} " + " ".join(f"{name:>22}" for name in RANGES))
+    for processes in process_counts:
+        system.prediction_pool.shutdown()
+        system.prediction_pool.processes = processes
+        cells = []
+        for name, (start, end) in RANGES.items():
+            dates = list(pd.date_range(start, end, freq='D').to_pydatetime())
+            if processes > 1:
+                time_range(system, dates, 1)  # start the pool and load models in every process
+            seconds = time_range(system, dates, args.repeat)
+            baseline.setdefault(name, seconds)
+            cells.append(f"{seconds * 1000:9.0f} ms ({baseline[name] / seconds:4.1f}x)")
+        print(f"{processes:>9} " + " ".join(f"{cell:>22}" for cell in cells))
+    system.prediction_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
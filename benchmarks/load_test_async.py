@@ -0,0 +1,138 @@
+"""
+Load test: sync (gunicorn gthread) vs async (uvicorn + asgi_app) serving.
+
+Starts each server in turn as a single worker process with the same number
+of request threads, then drives it with a mix of slow requests (year-long
+/api/aqi/range and /api/dashboard for rotating dates, so the HTTP and
+prediction caches do not absorb them) and cheap ones (/api/health, a static
+page). Prints p50/p99 latency per request class at matched concurrency.
+Run from the repo root (needs gunicorn and uvicorn):
+
+    python benchmarks/load_test_async.py [--clients 16] [--duration 20] [--threads 4]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'sync (gunicorn gthread)': lambda port, threads: (
+        ['gunicorn', '-c', 'gunicorn.conf.py'],
+        {'PORT': str(port), 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': str(threads), 'AQI_SERVER_MODE': 'wsgi'}),
+    'async (uvicorn asgi_app)': lambda port, threads: (
+        ['gunicorn', '-c', 'gunicorn.conf.py'],
+        {'PORT': str(port), 'WEB_CONCURRENCY': '1', 'AQI_ASGI_THREADS': str(threads), 'AQI_SERVER_MODE': 'asgi'}),
+}
+
+
+def slow_url(rng):
+    day = date(2000, 1, 1) + timedelta(days=rng.randrange(365 * 40))
+    if rng.random() < 0.5:
+        return 'slow', f"/api/aqi/range?start={day}&end={day + timedelta(days=364)}&models=all"
+    return 'slow', f"/api/dashboard?date={day}"
+
+
+def cheap_url(rng):
+    return 'cheap', rng.choice(['/api/health', '/index.html'])
+
+
+def wait_until_ready(base_url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/health", timeout=2):
+                return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.5)
+    return False
+
+
+def client_loop(base_url, seed, slow_share, stop_at, results, lock):
+    rng = random.Random(seed)
+    while time.time() < stop_at:
+        kind, path = slow_url(rng) if rng.random() < slow_share else cheap_url(rng)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=120) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, ConnectionError, OSError):
+            status = 0
+        elapsed = time.perf_counter() - started
+        with lock:
+            results.append((kind, status, elapsed))
+
+
+def run_server(name, port, args):
+    command, extra_env = SERVERS[name](port, args.threads)
+    env = dict(os.environ, **extra_env)
+    env.setdefault('AQI_LOG_LEVEL', 'WARNING')
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_ready(base_url):
+            print(f"❌ {name} did not start")
+            return None
+        results, lock = [], threading.Lock()
+        stop_at = time.time() + args.duration
+        clients = [threading.Thread(target=client_loop,
+                                    args=(base_url, seed, args.slow_share, stop_at, results, lock))
+                   for seed in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def summarize(name, results, duration):
+    print(f"\n{name}: {len(results)} requests in {duration}s ({len(results) / duration:.1f} req/s)")
+    print(f"   {'class':<6} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind in ('cheap', 'slow'):
+        rows = [(status, elapsed) for k, status, elapsed in results if k == kind]
+        if not rows:
+            continue
+        latencies = np.array([elapsed for _, elapsed in rows]) * 1000
+        errors = sum(1 for status, _ in rows if status != 200)
+        print(f"   {kind:<6} {len(rows):>6} {errors:>6} {np.percentile(latencies, 50):>9.1f} "
+              f"{np.percentile(latencies, 99):>9.1f} {latencies.max():>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--duration', type=int, default=20, help='seconds per server')
+    parser.add_argument('--threads', type=int, default=4, help='request threads per server (both modes)')
+    parser.add_argument('--slow-share', type=float, default=0.3, help='fraction of slow requests')
+    parser.add_argument('--port', type=int, default=8910)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.threads} request threads per server, "
+          f"{args.slow_share:.0%} slow requests, {args.duration}s each")
+    for offset, name in enumerate(SERVERS):
+        results = run_server(name, args.port + offset, args)
+        if results is not None:
+            summarize(name, results, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark suite for the prediction and API hot paths.
+
+Times single-date prediction, batch prediction, the dashboard's batched
+prediction plan and chart assembly (DashboardContext),
+get_highest_concentration_days and /api/dashboard, /api/pollutants and
+/api/prediction (Flask test client). Every case runs against a small seeded
+tree-ensemble artifact (benchmarks/synthetic_models.py) unless --model-path
+is given, with the prediction table and observed history disabled and the
+prediction cache cleared before every call, so each timing is the full
+compute path. Dates change per iteration for the same reason.
+
+Results are written as JSON (median / p95 / min per case plus commit and
+library versions). With --compare, medians are checked against an earlier
+result file and the script exits 1 when any case is slower by more than
+--threshold. Run from the repo root:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json --threshold 0.10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Dates beyond any training data, so nothing is served from history
+BASE_DATE = datetime(2031, 1, 1)
+
+
+def configure_environment():
+    """Precompute and history off, quiet logs; must run before any repo module is imported."""
+    os.environ['AQI_PRECOMPUTE_YEARS'] = '0'
+    os.environ['AQI_HISTORY_PATH'] = os.path.join(tempfile.gettempdir(), 'aqi_bench_no_history.npz')
+    os.environ.setdefault('AQI_LOG_LEVEL', 'WARNING')
+
+
+def load_backend(model_path):
+    """Import flask_api_backend against ``model_path``."""
+    os.environ['AQI_MODEL_PATH'] = model_path
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import flask_api_backend
+    if not flask_api_backend.models_trained:
+        raise SystemExit(f"❌ Models from {model_path} did not load; benchmarks need trained models")
+    return flask_api_backend
+
+
+def build_cases(backend):
+    """name -> fn(iteration); each call does one unit of work on a fresh date."""
+    system = backend.aqi_system
+    client = backend.app.test_client()
+
+    def day(i, step=1):
+        return BASE_DATE + timedelta(days=i * step)
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} -> {response.status_code}")
+
+    def batch(i):
+        start = day(i, 365)
+        system.predict_aqi_for_dates([start + timedelta(days=d) for d in range(365)])
+
+    def dashboard_context(i):
+        context = backend.DashboardContext(day(i, 365))
+        context.card_aqi(context.target_date)
+        context.card_aqi(context.next_date)
+        context.chart_aqi()
+
+    return {
+        'predict_single': lambda i: system.predict_aqi_for_date(day(i)),
+        'predict_batch_365': batch,
+        'dashboard_context': dashboard_context,
+        'highest_concentration_days': lambda i: system.get_highest_concentration_days(
+            day(i, 31).year, day(i, 31).month),
+        'api_dashboard': lambda i: get(f"/api/dashboard?date={day(i, 365):%Y-%m-%d}"),
+        'api_pollutants': lambda i: get(f"/api/pollutants?year={day(i, 31).year}&month={day(i, 31).month}"),
+        'api_prediction': lambda i: get(f"/api/prediction?date={day(i, 365):%Y-%m-%d}&model=gbr"),
+    }
+
+
+def time_case(fn, clear_cache, repeat, warmup):
+    samples = []
+    for i in range(warmup + repeat):
+        clear_cache()
+        started = time.perf_counter()
+        fn(i)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed * 1000)
+    samples = np.array(samples)
+    return {
+        'median_ms': round(float(np.median(samples)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'min_ms': round(float(samples.min()), 3),
+        'iterations': len(samples)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(model_path, synthetic, repeat):
+    import pandas
+    import sklearn
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'model_path': None if synthetic else model_path,
+        'synthetic_models': synthetic,
+        'repeat': repeat
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print median ratios against ``baseline``; returns the names of regressed cases."""
+    regressions = []
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} (threshold +{threshold:.0%})")
+    print(f"   {'case':<28} {'base ms':>9} {'now ms':>9} {'ratio':>7}")
+    for name, current in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"   {name:<28} {'-':>9} {current['median_ms']:>9.2f}     new")
+            continue
+        ratio = current['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(f"   {name:<28} {previous['median_ms']:>9.2f} {current['median_ms']:>9.2f} "
+              f"{ratio:>6.2f}x{'  ❌ REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-path', default=None, help='real model pickle (default: synthetic artifact)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per case')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed calls per case')
+    parser.add_argument('--cases', default=None, help='comma-separated subset of case names')
+    parser.add_argument('--output', default=None, help='write results JSON here')
+    parser.add_argument('--compare', default=None, help='earlier results JSON to check against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed median slowdown before failing, as a fraction (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    configure_environment()
+    synthetic = args.model_path is None
+    workdir = tempfile.TemporaryDirectory() if synthetic else None
+    model_path = args.model_path
+    if synthetic:
+        from synthetic_models import build_synthetic_artifact
+        print("🧪 Building synthetic model artifact...")
+        model_path = build_synthetic_artifact(os.path.join(workdir.name, 'aqi_synthetic_models.pkl'))
+
+    backend = load_backend(model_path)
+    cases = build_cases(backend)
+    if args.cases:
+        selected = [name.strip() for name in args.cases.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in cases]
+        if unknown:
+            raise SystemExit(f"❌ Unknown cases {unknown}; choose from {list(cases)}")
+        cases = {name: cases[name] for name in selected}
+
+    results = {}
+    print(f"   {'case':<28} {'median ms':>10} {'p95 ms':>9} {'min ms':>9}")
+    for name, fn in cases.items():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results[name] = time_case(fn, backend.aqi_system._prediction_cache.clear, args.repeat, args.warmup)
+        r = results[name]
+        print(f"   {name:<28} {r['median_ms']:>10.2f} {r['p95_ms']:>9.2f} {r['min_ms']:>9.2f}")
+
+    report = {'meta': metadata(model_path, synthetic, args.repeat), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if workdir is not None:
+        workdir.cleanup()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} case(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
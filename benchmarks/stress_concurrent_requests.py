@@ -0,0 +1,72 @@
+"""
+Stress check: concurrent API requests must return exactly what serial ones do.
+
+Fires the deterministic endpoints from a thread pool through the Flask test
+client and compares every response body with a serial run of the same URLs.
+The prediction cache is disabled so each request really recomputes. Run from
+the repo root (uses ./aqi_prediction_system.py's models if aqi_4_models.pkl
+is present, simulation otherwise):
+
+    python benchmarks/stress_concurrent_requests.py [--threads 16] [--rounds 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AQI_PREDICTION_CACHE_SIZE', '0')
+os.environ.setdefault('AQI_LOG_LEVEL', 'WARNING')
+
+import flask_api_backend  # noqa: E402
+
+
+def build_urls(days):
+    start = datetime(2025, 1, 1)
+    urls = []
+    for d in range(days):
+        date_str = (start + timedelta(days=d * 11)).strftime('%Y-%m-%d')
+        urls.append(f'/api/dashboard?date={date_str}')
+        urls.append(f'/api/recommendations?date={date_str}')
+        for model in ('gbr', 'rf', 'et', 'xgboost'):
+            urls.append(f'/api/prediction?date={date_str}&model={model}')
+    for month in range(1, 13):
+        for pollutant in ('PM2.5', 'O3', 'CO'):
+            urls.append(f'/api/pollutants?year=2025&month={month}&pollutant={pollutant}')
+    return urls
+
+
+def fetch(url):
+    with flask_api_backend.app.test_client() as client:
+        response = client.get(url)
+        return response.status_code, json.dumps(response.get_json(), sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--days', type=int, default=8)
+    args = parser.parse_args()
+
+    urls = build_urls(args.days)
+    expected = {url: fetch(url) for url in urls}
+
+    mismatches = 0
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for _ in range(args.rounds):
+            for url, result in zip(urls, pool.map(fetch, urls)):
+                if result != expected[url]:
+                    mismatches += 1
+                    print(f"MISMATCH {url}")
+
+    total = len(urls) * args.rounds
+    print(f"{total} concurrent requests on {args.threads} threads, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
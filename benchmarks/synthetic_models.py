@@ -0,0 +1,82 @@
+"""
+Synthetic model artifact for benchmarks: a small aqi_4_models.pkl look-alike.
+
+Fits gbr / rf / et (scikit-learn tree ensembles) and an "xgboost" slot
+(HistGradientBoostingRegressor, so xgboost is not required) on six years
+of generated daily AQI with the real feature columns. The file has the
+same layout as the training pickle ('models', 'best_model',
+'feature_columns', 'training_info'), so AQIPredictionSystem loads it the
+normal way. Fitting is seeded, so every run produces identical models.
+
+    python benchmarks/synthetic_models.py /tmp/aqi_synthetic_models.pkl
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (ExtraTreesRegressor, GradientBoostingRegressor,
+                              HistGradientBoostingRegressor, RandomForestRegressor)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aqi_prediction_system import EXACT_FEATURE_COLUMNS
+
+
+def synthetic_training_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2019-01-01', '2024-12-31', freq='D')
+    day_of_year = dates.dayofyear.to_numpy()
+    aqi = pd.Series(50 + 20 * np.sin(2 * np.pi * day_of_year / 365) + rng.normal(0, 8, len(dates)))
+    features = pd.DataFrame({
+        'year': dates.year, 'month': dates.month, 'day': dates.day, 'weekday': dates.weekday,
+        'day_of_year': day_of_year, 'is_weekend': (dates.weekday >= 5).astype(int),
+        'daily_avg_temp': 25 + 10 * np.sin(2 * np.pi * day_of_year / 365),
+        'aqi_lag_1': aqi.shift(1), 'aqi_lag_3': aqi.shift(3), 'aqi_lag_7': aqi.shift(7),
+        'aqi_ma_3': aqi.rolling(3).mean(), 'aqi_ma_7': aqi.rolling(7).mean(),
+        'aqi_trend_3': aqi.diff(3), 'aqi_volatility': aqi.rolling(7).std()
+    })[EXACT_FEATURE_COLUMNS].fillna(50.0).astype(float)
+    return features, aqi.to_numpy()
+
+
+def build_synthetic_artifact(path, seed=0):
+    """🧪 FIT SMALL SEEDED ENSEMBLES AND PICKLE THEM IN THE TRAINING-FILE LAYOUT"""
+    features, target = synthetic_training_frame(seed)
+    models = {
+        'gbr': GradientBoostingRegressor(n_estimators=100, max_depth=3, random_state=seed),
+        'rf': RandomForestRegressor(n_estimators=50, max_depth=10, random_state=seed),
+        'et': ExtraTreesRegressor(n_estimators=50, max_depth=10, random_state=seed),
+        'xgboost': HistGradientBoostingRegressor(max_iter=50, random_state=seed)
+    }
+    artifact = {
+        'models': {},
+        'best_model': 'gbr',
+        'feature_columns': list(EXACT_FEATURE_COLUMNS),
+        'training_info': {'training_date': '2025-01-01', 'data_samples': len(features), 'synthetic': True}
+    }
+    for key, model in models.items():
+        model.fit(features, target)
+        predictions = model.predict(features)
+        errors = predictions - target
+        artifact['models'][key] = {
+            'model': model,
+            'performance': {
+                'r2_score': float(model.score(features, target)),
+                'mae': float(np.mean(np.abs(errors))),
+                'rmse': float(np.sqrt(np.mean(errors ** 2))),
+                'mape': float(np.mean(np.abs(errors / target)) * 100)
+            },
+            'used_tuning': False
+        }
+    with open(path, 'wb') as f:
+        pickle.dump(artifact, f)
+    return path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(f"usage: python {os.path.basename(sys.argv[0])} <output.pkl>")
+        sys.exit(2)
+    print(f"✅ Wrote {build_synthetic_artifact(sys.argv[1])}")
@@ -1,35 +1,168 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, g, make_response
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import cProfile
+import functools
+import gzip
+import hmac
 import json
+import logging
 import numpy as np
 import random
 from calendar import monthrange
 import hashlib
 import math
 import os
+import pstats
+import threading
+import time
+
+from aqi_metrics import REGISTRY, STAGE_SECONDS, start_span_capture, stop_span_capture
 
 # Import the FIXED AQI prediction system
 try:
-    from aqi_prediction_system import AQIPredictionSystem
+    from aqi_prediction_system import (AQIPredictionSystem, default_model_path, set_prediction_caller,
+                                       reset_prediction_caller, ensemble_weights, weighted_ensemble,
+                                       ModelFileWatcher, MODEL_RELOAD_INTERVAL, HistoryFileWatcher,
+                                       HISTORY_SYNC_INTERVAL, configure_logging)
+    configure_logging()
     HAS_AQI_SYSTEM = True
 except ImportError:
     print("AQI System not found. Please run aqi_prediction_system.py first.")
     HAS_AQI_SYSTEM = False
 
-app = Flask(__name__, static_folder=".", static_url_path="")
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Static files go through serve_static (extension allow-list + caching), not Flask's static route
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
 
+# Log label for predictions made while serving each endpoint
+PREDICTION_CALLER_TAGS = {
+    'get_dashboard_data': 'DASHBOARD',
+    'get_prediction': 'PREDICTION',
+    'get_pollutants_data': 'POLLUTANTS',
+    'get_recommendations': 'RECOMMENDATIONS',
+    'get_aqi_range': 'RANGE',
+}
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'aqi_http_requests_total', 'HTTP requests by route, method and status.', ['route', 'method', 'status'])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'aqi_http_request_duration_seconds', 'HTTP request latency by route.', ['route', 'method'])
+
+@app.before_request
+def _tag_prediction_caller():
+    g.request_started = time.perf_counter()
+    tag = PREDICTION_CALLER_TAGS.get(request.endpoint)
+    if HAS_AQI_SYSTEM and tag:
+        g.prediction_caller_token = set_prediction_caller(tag)
+
+# Registered first so it runs after every other after_request hook (compression included)
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def _untag_prediction_caller(exc):
+    token = g.pop('prediction_caller_token', None)
+    if token is not None:
+        reset_prediction_caller(token)
+
 # Serve static files
 @app.route('/')
 def home():
-    return send_from_directory('.', 'index.html')
+    return serve_static('index.html')
+
+# Extension -> browser cache lifetime (seconds). Anything else (.py, .pkl, ...) is refused.
+SAFE_EXTS = {
+    '.html': 3600, '.css': 86400, '.js': 86400, '.json': 3600, '.txt': 3600,
+    '.png': 2592000, '.jpg': 2592000, '.jpeg': 2592000, '.gif': 2592000,
+    '.svg': 2592000, '.ico': 2592000, '.webp': 2592000,
+    '.woff': 31536000, '.woff2': 31536000, '.ttf': 31536000
+}
+COMPRESSIBLE_EXTS = {'.html', '.css', '.js', '.json', '.txt', '.svg'}
+# (full path, encoding) -> (mtime, compressed body); one entry per file and encoding
+_static_compressed = {}
+
+def _preferred_encoding():
+    accepted = request.accept_encodings
+    if HAS_BROTLI and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+# Dynamic responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('AQI_COMPRESS_MIN_BYTES', '512'))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/octet-stream'}
+
+def _compress_bytes(raw, encoding):
+    if encoding == 'br':
+        return brotli.compress(raw, quality=5)
+    return gzip.compress(raw, compresslevel=6, mtime=0)
+
+@app.after_request
+def _compress_response(response):
+    """Negotiated gzip/brotli for API payloads (static files are handled in serve_static)."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _preferred_encoding()
+    raw = response.get_data()
+    if encoding is None or len(raw) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(_compress_bytes(raw, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+def _compressed_static(path, encoding):
+    """Compressed bytes of a static file, recompressed (replacing the old body) when its mtime changes."""
+    full_path = os.path.join(app.root_path, path)
+    key = (full_path, encoding)
+    mtime = os.path.getmtime(full_path)
+    cached = _static_compressed.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(full_path, 'rb') as f:
+        raw = f.read()
+    body = brotli.compress(raw) if encoding == 'br' else gzip.compress(raw, compresslevel=9, mtime=0)
+    _static_compressed[key] = (mtime, body)
+    return body
 
 @app.route('/<path:path>')
 def serve_static(path):
-    if os.path.splitext(path)[1] in SAFE_EXTS:
-        return send_from_directory('.', path)
-    return "File type not allowed", 403
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SAFE_EXTS:
+        return "File type not allowed", 403
+    response = send_from_directory('.', path, max_age=SAFE_EXTS[ext])
+    encoding = _preferred_encoding() if ext in COMPRESSIBLE_EXTS else None
+    if encoding and response.status_code == 200:
+        response.direct_passthrough = False
+        response.set_data(_compressed_static(path, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            # Each encoding is a different representation, so it gets its own ETag
+            response.set_etag(f"{etag}-{encoding}")
+            response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    return response
 
 print("🚀 ENHANCED AirSight Flask API with REAL ML Models")
 print("=" * 60)
@@ -49,6 +182,11 @@ def _seeded_rng(seed_str: str):
     h = int(hashlib.sha256(seed_str.encode("utf-8")).hexdigest(), 16) % (2**32)
     return random.Random(h)
 
+def _np_rng(seed_str: str):
+    """Per-call NumPy Generator; never touches the global np.random state."""
+    h = int(hashlib.md5(seed_str.encode("utf-8")).hexdigest()[:8], 16) % (2**32)
+    return np.random.default_rng(h)
+
 def _round_val(val, unit):
     if unit == "ppm":
         return round(val, 1)
@@ -71,8 +209,9 @@ if HAS_AQI_SYSTEM:
     print("🔧 Initializing AQI Prediction System...")
     aqi_system = AQIPredictionSystem()
     try:
-        print("📦 Loading your trained ML models from aqi_4_models.pkl...")
-        success = aqi_system.load_models('aqi_4_models.pkl')
+        model_path = default_model_path()
+        print(f"📦 Loading your trained ML models from {model_path}...")
+        success = aqi_system.load_models(model_path)
         if success and aqi_system.use_trained_models and aqi_system.trained_models_loaded:
             models_trained = True
             print("✅ REAL ML MODELS LOADED SUCCESSFULLY!")
@@ -107,6 +246,272 @@ else:
 print("🌐 Flask API initializing...")
 print("=" * 60)
 
+# ---------------- HTTP caching ----------------
+# Browser/proxy freshness for deterministic API responses; ETags revalidate after that
+API_MAX_AGE = int(os.environ.get('AQI_HTTP_MAX_AGE', '300'))
+MODELS_LOADED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+
+def _response_version():
+    """Everything besides the URL that changes API output: models, history, today."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    if not aqi_system:
+        return ['simulation', today]
+    return [aqi_system.model_fingerprint, _ml_models_active(), len(aqi_system.history), today]
+
+def _response_etag():
+    key = [request.endpoint, sorted(request.args.items(multi=True)), _response_version()]
+    return hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()[:32]
+
+def _response_last_modified():
+    """Latest of model load, local midnight and the last observed-history change."""
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(timezone.utc)
+    candidates = [MODELS_LOADED_AT, midnight]
+    history_updated_at = aqi_system.history_updated_at if aqi_system else None
+    if history_updated_at is not None:
+        # HTTP dates have whole seconds; round up so a same-second change is never "not modified"
+        candidates.append(history_updated_at.replace(microsecond=0) + timedelta(seconds=bool(history_updated_at.microsecond)))
+    return max(candidates)
+
+def http_cached(view):
+    """Strong ETag + Last-Modified for a deterministic GET view; answers 304 without running it."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = _response_etag()
+        last_modified = _response_last_modified()
+        if request.if_none_match:
+            # A compressed 200 carried "<etag>-<encoding>" (see _compress_response)
+            matched = [tag for tag in (etag, f"{etag}-{_preferred_encoding()}") if request.if_none_match.contains(tag)]
+            not_modified = bool(matched)
+            if matched:
+                etag = matched[0]
+        else:
+            not_modified = bool(request.if_modified_since and request.if_modified_since >= last_modified)
+
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = API_MAX_AGE
+        response.vary.add('Accept-Encoding')
+        return response
+    return wrapper
+
+# ---------------- Metrics ----------------
+def _cache_metric_values():
+    stats = aqi_system.get_cache_stats() if aqi_system else None
+    return [({}, stats['hit_ratio'])] if stats else []
+
+def _model_info_values():
+    if not aqi_system:
+        return [({'fingerprint': '', 'best_model': '', 'source': 'simulation'}, 1)]
+    return [({'fingerprint': aqi_system.model_fingerprint or '',
+              'best_model': aqi_system.best_model_name or '',
+              'source': 'trained' if _ml_models_active() else 'simulation'}, 1)]
+
+REGISTRY.gauge('aqi_prediction_cache_hit_ratio', 'Prediction cache hits / lookups.', callback=_cache_metric_values)
+REGISTRY.gauge('aqi_prediction_cache_entries', 'Entries in the prediction cache.',
+               callback=lambda: [({}, aqi_system.get_cache_stats()['size'])] if aqi_system else [])
+REGISTRY.gauge('aqi_model_info', 'Currently loaded model file (value is always 1).',
+               ['fingerprint', 'best_model', 'source'], callback=_model_info_values)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of this process's counters and histograms."""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8',
+                    headers={'Cache-Control': 'no-store'})
+
+# ---------------- Profiling ----------------
+# Off unless AQI_PROFILE_TOKEN is set (the hooks below are not even registered).
+# With a token, a request carrying it in the X-AQI-Profile header runs under
+# cProfile (?profile=<token> works too, but query strings end up in access
+# logs and browser history, so prefer the header); JSON responses gain a "profile" key with time per stage
+# (feature_build, model_predict, chart_generation, ...) and the top functions
+# by cumulative time. AQI_PROFILE_DIR also keeps the raw .prof file.
+PROFILE_TOKEN = os.environ.get('AQI_PROFILE_TOKEN', '')
+PROFILE_TOP_N = int(os.environ.get('AQI_PROFILE_TOP_N', '25'))
+PROFILE_DIR = os.environ.get('AQI_PROFILE_DIR', '')
+
+# One profiled request at a time per process (Python 3.12+ allows a single active profiler)
+_profile_lock = threading.Lock()
+# Shares the prediction system's logger (handler and AQI_LOG_LEVEL)
+profile_logger = logging.getLogger('aqi_prediction_system')
+
+def _profile_requested():
+    supplied = request.headers.get('X-AQI-Profile') or request.args.get('profile')
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), PROFILE_TOKEN.encode())
+
+def _start_profiler():
+    if not _profile_requested() or not _profile_lock.acquire(blocking=False):
+        return
+    g.profile_span_token = start_span_capture()
+    g.profile_started = time.perf_counter()
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+def _finish_profile():
+    """Stop this request's profiler; returns the summary dict, or None if it was not profiled."""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    try:
+        profiler.disable()
+        total_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+        spans = stop_span_capture(g.pop('profile_span_token'))
+    finally:
+        _profile_lock.release()
+
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    top = []
+    for func in stats.fcn_list[:PROFILE_TOP_N]:
+        _, calls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, name = func
+        top.append({'function': f"{os.path.basename(filename)}:{line}({name})", 'calls': calls,
+                    'tottime_ms': round(tottime * 1000, 3), 'cumtime_ms': round(cumtime * 1000, 3)})
+
+    profile = {'total_ms': round(total_ms, 3), 'spans': spans, 'top': top}
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        profile['file'] = os.path.join(PROFILE_DIR, f"{request.endpoint or 'unmatched'}-{stamp}.prof")
+        profiler.dump_stats(profile['file'])
+    # request.path, not full_path: the query string may carry the profile token
+    profile_logger.info("🔬 Profiled %s %s: %.1f ms", request.method, request.path, total_ms)
+    return profile
+
+def _attach_profile(response):
+    """Runs before _compress_response, so the JSON body is still plain."""
+    profile = _finish_profile()
+    if profile is None:
+        return response
+    # The body no longer matches the cached representation
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers.pop('ETag', None)
+    response.headers.pop('Last-Modified', None)
+    response.headers['X-AQI-Profile-Ms'] = str(profile['total_ms'])
+    if 'file' in profile:
+        response.headers['X-AQI-Profile-File'] = profile['file']
+    payload = response.get_json(silent=True) if response.is_json else None
+    if isinstance(payload, dict):
+        payload['profile'] = profile
+        response.set_data(json.dumps(payload))
+    return response
+
+def _abandon_profile(exc):
+    _finish_profile()
+
+if PROFILE_TOKEN:
+    app.before_request(_start_profiler)
+    app.after_request(_attach_profile)
+    app.teardown_request(_abandon_profile)
+
+# ---------------- Model reload ----------------
+# New model files are picked up without a restart, either by polling
+# (AQI_MODEL_RELOAD_INTERVAL seconds) or via POST /api/admin/reload-models
+# with X-AQI-Admin-Token: $AQI_ADMIN_TOKEN. Loading and validation run on a
+# background thread; requests keep using the old models until the swap.
+# Each gunicorn worker holds its own models, so with several workers use
+# polling; the admin endpoint only reloads the worker that answers it.
+ADMIN_TOKEN = os.environ.get('AQI_ADMIN_TOKEN', '')
+_model_watcher = None
+_model_watcher_lock = threading.Lock()
+
+def _on_models_reloaded(status):
+    global MODELS_LOADED_AT, models_trained
+    if status.get('status') == 'reloaded':
+        MODELS_LOADED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+        models_trained = True
+        print(f"♻️ Models reloaded: {status['models']} (best: {status['best_model']}) in {status['seconds']}s")
+    elif status.get('status') == 'rejected':
+        print(f"⚠️ Model reload rejected, keeping current models: {status['reason']}")
+
+def _reload_in_background():
+    threading.Thread(target=lambda: _on_models_reloaded(aqi_system.reload_models()),
+                     name='aqi-model-reload', daemon=True).start()
+
+def _ensure_model_watcher():
+    """Started on a worker's first request: threads do not survive gunicorn's fork."""
+    global _model_watcher
+    if _model_watcher is None:
+        with _model_watcher_lock:
+            if _model_watcher is None:
+                path = aqi_system.model_path or default_model_path()
+                _model_watcher = ModelFileWatcher(aqi_system, path, MODEL_RELOAD_INTERVAL,
+                                                  on_reload=_on_models_reloaded).start()
+
+if aqi_system and MODEL_RELOAD_INTERVAL > 0:
+    app.before_request(_ensure_model_watcher)
+
+def _admin_authorized():
+    supplied = request.headers.get('X-AQI-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+@app.route('/api/admin/reload-models', methods=['GET', 'POST'])
+def reload_models_endpoint():
+    """POST starts a background reload of the model file (202); GET reports the last one."""
+    if not ADMIN_TOKEN or not aqi_system:
+        return jsonify({'error': 'Model reload endpoint is disabled'}), 404
+    if not _admin_authorized():
+        return jsonify({'error': 'Invalid admin token'}), 403
+    if request.method == 'GET':
+        return jsonify({'last_reload': aqi_system.last_reload, 'model_fingerprint': aqi_system.model_fingerprint})
+    if aqi_system.reloading:
+        return jsonify({'status': 'busy', 'last_reload': aqi_system.last_reload}), 409
+    _reload_in_background()
+    return jsonify({'status': 'started', 'path': aqi_system.model_path or default_model_path()}), 202
+
+# ---------------- Observed AQI history ----------------
+# Observed daily AQI drives the models' lag features. Build the history file
+# (AQI_HISTORY_PATH) once with `python aqi_history.py observed.csv
+# aqi_history.npz`, then append each new day via POST /api/admin/observed-aqi
+# with X-AQI-Admin-Token: $AQI_ADMIN_TOKEN and {"date": "YYYY-MM-DD", "aqi": 87}
+# or {"observations": [{"date": ..., "aqi": ...}, ...]}. The worker answering
+# the POST appends under a file lock, rewrites the shared file and updates its
+# own cache at once. Every other gunicorn worker polls that file every
+# AQI_HISTORY_SYNC_INTERVAL seconds (default 10) and applies the new days the
+# same way, so all workers agree within one interval; with the interval at 0
+# they keep the old history until restarted.
+_history_watcher = None
+_history_watcher_lock = threading.Lock()
+
+def _ensure_history_watcher():
+    """Started on a worker's first request: threads do not survive gunicorn's fork."""
+    global _history_watcher
+    if _history_watcher is None:
+        with _history_watcher_lock:
+            if _history_watcher is None:
+                _history_watcher = HistoryFileWatcher(aqi_system, HISTORY_SYNC_INTERVAL).start()
+
+if aqi_system and HISTORY_SYNC_INTERVAL > 0:
+    app.before_request(_ensure_history_watcher)
+
+@app.route('/api/admin/observed-aqi', methods=['GET', 'POST'])
+def observed_aqi_endpoint():
+    """POST appends observed days to the shared history (201); GET describes it."""
+    if not ADMIN_TOKEN or not aqi_system:
+        return jsonify({'error': 'Observed AQI endpoint is disabled'}), 404
+    if not _admin_authorized():
+        return jsonify({'error': 'Invalid admin token'}), 403
+    if request.method == 'GET':
+        aqi_system.sync_history()
+        return jsonify({'history': aqi_system.history.describe()})
+    body = request.get_json(silent=True)
+    items = body.get('observations', [body]) if isinstance(body, dict) else body
+    try:
+        observations = [(str(item['date']), float(item['aqi'])) for item in items]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'expected {"date": "YYYY-MM-DD", "aqi": <number>} or {"observations": [...]}'}), 400
+    try:
+        recorded = aqi_system.record_observations(observations)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'history': aqi_system.history.describe()}), 400
+    print(f"📝 Recorded {recorded} observed AQI day(s); history now {aqi_system.history.describe()}")
+    return jsonify({'recorded': recorded, 'history': aqi_system.history.describe()}), 201
+
 # ---------------- Health ----------------
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -124,12 +529,22 @@ def health_check():
         'best_model': aqi_system.best_model_name if models_trained else None,
         'system_type': 'ENHANCED_REAL_ML_SYSTEM',
         'real_models_active': aqi_system.use_trained_models if models_trained else False,
+        'prediction_cache': aqi_system.get_cache_stats() if aqi_system else None,
+        'prediction_store': aqi_system.prediction_store.stats() if aqi_system and aqi_system.prediction_store else None,
+        'prediction_table': aqi_system.prediction_table.describe() if aqi_system and aqi_system.prediction_table else None,
+        'inference_backends': aqi_system.get_inference_backends() if models_trained else {},
+        'prediction_pool': aqi_system.prediction_pool.describe() if aqi_system else None,
+        'last_model_reload': aqi_system.last_reload if aqi_system else None,
+        'aqi_history': aqi_system.history.describe() if aqi_system else None,
         'timestamp': datetime.now().isoformat()
     })
 
 # ---------------- AQI helpers ----------------
+def _ml_models_active():
+    return bool(models_trained and aqi_system and aqi_system.use_trained_models and aqi_system.trained_models_loaded)
+
 def get_consistent_aqi_for_date(date_str, offset_hours=0, model_name='gradient_boosting'):
-    if models_trained and aqi_system and aqi_system.use_trained_models and aqi_system.trained_models_loaded:
+    if _ml_models_active():
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d')
             if offset_hours > 0:
@@ -139,30 +554,42 @@ def get_consistent_aqi_for_date(date_str, offset_hours=0, model_name='gradient_b
         except Exception as e:
             print(f"❌ ML prediction failed for {date_str}: {e}")
 
-    # simulation fallback
+    return _simulated_consistent_aqi(date_str, offset_hours)
+
+def _simulated_consistent_aqi(date_str, offset_hours=0):
     date_obj = datetime.strptime(date_str, '%Y-%m-%d')
     day_of_year = date_obj.timetuple().tm_yday
-    seed_string = f"{date_str}-{offset_hours}"
-    date_seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16) % (2**32)
-    np.random.seed(date_seed)
+    rng = _np_rng(f"{date_str}-{offset_hours}")
     seasonal_base = 50 + 25 * np.sin(day_of_year * 2 * np.pi / 365)
     month = date_obj.month
     seasonal_adjustment = 15 if month in [11,12,1,2] else (-10 if month in [6,7,8,9] else 5)
-    daily_variation = np.random.normal(0, 12)
+    daily_variation = rng.normal(0, 12)
     hour_effect = offset_hours * 0.3 if offset_hours > 0 else 0
     aqi = seasonal_base + seasonal_adjustment + daily_variation + hour_effect
     aqi = max(20, min(120, aqi))
-    np.random.seed(None)
     return round(aqi)
 
+def get_consistent_aqi_series(date_strs, model_name='gradient_boosting'):
+    """Batched get_consistent_aqi_for_date: one model call for the whole list."""
+    date_strs = list(date_strs)
+    if _ml_models_active():
+        try:
+            aqis = aqi_system.predict_aqi_for_dates(date_strs, model_name)
+            return [round(aqi) if aqi is not None else _simulated_consistent_aqi(ds)
+                    for ds, aqi in zip(date_strs, aqis)]
+        except Exception as e:
+            print(f"❌ Batched ML prediction failed: {e}")
+    return [_simulated_consistent_aqi(ds) for ds in date_strs]
+
+MODEL_KEY_MAPPING = {
+    'gradient_boosting': 'gbr', 'gbr': 'gbr',
+    'random_forest': 'rf', 'rf': 'rf',
+    'extra_trees': 'et', 'et': 'et',
+    'xgboost': 'xgboost'
+}
+
 def get_model_specific_aqi(date_str, model_name, offset_hours=0):
-    model_mapping = {
-        'gradient_boosting': 'gbr', 'gbr': 'gbr',
-        'random_forest': 'rf', 'rf': 'rf',
-        'extra_trees': 'et', 'et': 'et',
-        'xgboost': 'xgboost'
-    }
-    backend_model = model_mapping.get(model_name, 'gbr')
+    backend_model = MODEL_KEY_MAPPING.get(model_name, 'gbr')
     if models_trained and aqi_system:
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d')
@@ -173,7 +600,9 @@ def get_model_specific_aqi(date_str, model_name, offset_hours=0):
         except Exception as e:
             print(f"❌ ML prediction failed for {date_str}: {e}")
 
-    # simulation
+    return _simulated_model_aqi(date_str, backend_model, offset_hours)
+
+def _simulated_model_aqi(date_str, backend_model, offset_hours=0):
     try:
         date_obj = datetime.strptime(date_str, '%Y-%m-%d')
         day_of_year = int(date_obj.timetuple().tm_yday)
@@ -181,89 +610,143 @@ def get_model_specific_aqi(date_str, model_name, offset_hours=0):
         date_seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16) % (2**32)
         model_seed_base = {'gbr':1000,'rf':2000,'et':3000,'xgboost':4000}
         date_seed += model_seed_base.get(backend_model, 5000)
-        np.random.seed(date_seed)
+        rng = np.random.default_rng(date_seed)
         base_aqi = 50.0 + 20.0 * np.sin(float(day_of_year) * 2.0 * np.pi / 365.0)
         variations = {'gbr':5.0,'rf':8.0,'et':12.0,'xgboost':18.0}
-        daily_variation = np.random.normal(0.0, variations.get(backend_model, 10.0))
+        daily_variation = rng.normal(0.0, variations.get(backend_model, 10.0))
         hour_effect = float(offset_hours) * 0.5 if offset_hours > 0 else 0.0
         bias = {'gbr':0.0,'rf':-2.0,'et':3.0,'xgboost':5.0}.get(backend_model, 0.0)
         aqi = base_aqi + daily_variation + hour_effect + bias
         aqi = max(20.0, min(120.0, aqi))
-        np.random.seed(None)
         return round(float(aqi))
     except Exception:
         return 45
 
-# ---------------- Chart data generators ----------------
-def generate_consistent_chart_data(base_date):
-    chart_data = []
-    year = base_date.year
-    month = base_date.month
-    current_date_str = base_date.strftime('%Y-%m-%d')
-    current_aqi = get_consistent_aqi_for_date(current_date_str)
-    current_month_index = month - 1
-    current_week_in_month = min(3, (base_date.day - 1) // 7)
-    current_week_position = current_month_index * 4 + current_week_in_month
-    using_ml_models = models_trained and aqi_system and aqi_system.use_trained_models and aqi_system.trained_models_loaded
-
-    for month_offset in range(12):
-        chart_month = month - 11 + month_offset
-        chart_year = year
-        while chart_month <= 0:
-            chart_month += 12
-            chart_year -= 1
-        for week in range(4):
-            week_position = month_offset * 4 + week
-            if week_position == current_week_position:
-                chart_data.append(current_aqi)
-            else:
-                week_day = 1 + (week * 7)
-                try:
-                    week_date = datetime(chart_year, chart_month, min(week_day, 28))
-                    if using_ml_models:
-                        weekly_aqi = aqi_system.predict_aqi_for_date(week_date)
-                    else:
-                        weekly_aqi = get_consistent_aqi_for_date(week_date.strftime('%Y-%m-%d'), offset_hours=week*24)
-                except ValueError:
-                    weekly_aqi = get_consistent_aqi_for_date(f"{chart_year}-{chart_month:02d}-15", offset_hours=week*24)
-                chart_data.append(round(weekly_aqi))
-    return chart_data
-
-def generate_daily_chart_data(base_date):
-    chart_data = []
-    year = base_date.year
-    current_date_str = base_date.strftime('%Y-%m-%d')
-    current_aqi = get_consistent_aqi_for_date(current_date_str)
-    start_of_year = datetime(year, 1, 1)
-    current_day_position = (base_date - start_of_year).days
-    using_ml_models = models_trained and aqi_system and aqi_system.use_trained_models and aqi_system.trained_models_loaded
-
-    for day_offset in range(365):
-        target_date = start_of_year + timedelta(days=day_offset)
-        if day_offset == current_day_position:
-            daily_aqi = current_aqi
-        else:
-            if using_ml_models:
-                try:
-                    daily_aqi = aqi_system.predict_aqi_for_date(target_date)
-                    daily_aqi = round(daily_aqi)
-                except Exception:
-                    daily_aqi = get_consistent_aqi_for_date(target_date.strftime('%Y-%m-%d'))
-            else:
-                daily_aqi = get_consistent_aqi_for_date(target_date.strftime('%Y-%m-%d'))
-        chart_data.append(daily_aqi)
-    return chart_data
+def get_model_specific_aqi_series(date_strs, model_name):
+    """Batched get_model_specific_aqi: one model call for the whole list."""
+    date_strs = list(date_strs)
+    backend_model = MODEL_KEY_MAPPING.get(model_name, 'gbr')
+    if models_trained and aqi_system:
+        try:
+            aqis = aqi_system.predict_aqi_for_dates(date_strs, backend_model)
+            return [round(float(aqi)) if aqi is not None else _simulated_model_aqi(ds, backend_model)
+                    for ds, aqi in zip(date_strs, aqis)]
+        except Exception as e:
+            print(f"❌ Batched ML prediction failed: {e}")
+    return [_simulated_model_aqi(ds, backend_model) for ds in date_strs]
+
+def get_model_specific_forecast(date_str, days, model_name):
+    """Rolling multi-day forecast (lags fed back from history + predictions)."""
+    backend_model = MODEL_KEY_MAPPING.get(model_name, 'gbr')
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    date_strs = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days)]
+    if models_trained and aqi_system:
+        try:
+            aqis = aqi_system.forecast_aqi(start, days, backend_model)
+            return [round(float(aqi)) if aqi is not None else _simulated_model_aqi(ds, backend_model)
+                    for ds, aqi in zip(date_strs, aqis)]
+        except Exception as e:
+            print(f"❌ ML forecast failed for {date_str}: {e}")
+    return [_simulated_model_aqi(ds, backend_model) for ds in date_strs]
+
+def get_all_models_forecast(date_str, days, performances):
+    """{'models': {backend_key: [aqi...]}, 'weights', 'ensemble'} for gbr/rf/et/xgboost in one pass.
+
+    ``performances`` ({backend_key: {'r2_score': ...}}) weights the simulated
+    ensemble when the ML models are not active.
+    """
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    date_strs = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days)]
+    if _ml_models_active():
+        try:
+            result = aqi_system.forecast_all_models(start, days, RANGE_MODELS)
+            result['models'] = {key: [round(float(aqi)) if aqi is not None else _simulated_model_aqi(ds, key)
+                                      for ds, aqi in zip(date_strs, values)]
+                                for key, values in result['models'].items()}
+            return result
+        except Exception as e:
+            print(f"❌ Multi-model forecast failed for {date_str}: {e}")
+    predictions = {key: [_simulated_model_aqi(ds, key) for ds in date_strs] for key in RANGE_MODELS}
+    if not HAS_AQI_SYSTEM:
+        return {'models': predictions, 'weights': {}, 'ensemble': []}
+    weights = ensemble_weights(performances, RANGE_MODELS)
+    return {'models': predictions, 'weights': weights, 'ensemble': weighted_ensemble(predictions, weights)}
 
 # ---------------- Dashboard ----------------
+class DashboardContext:
+    """Request-scoped AQI plan for /api/dashboard.
+
+    Collects every (date, model) the dashboard needs - the year chart with
+    the best model plus today/tomorrow with gbr - and predicts them with one
+    predict_aqi_for_dates call per distinct model. Cards, pollutant,
+    concentrations and chart values are then derived from those numbers.
+    """
+
+    def __init__(self, target_date, card_model='gbr'):
+        self.target_date = target_date
+        self.next_date = target_date + timedelta(days=1)
+        self.card_model = card_model
+        start_of_year = datetime(target_date.year, 1, 1)
+        self.chart_dates = [start_of_year + timedelta(days=d) for d in range(365)]
+        self.current_day_position = (target_date - start_of_year).days
+        self.using_ml_models = _ml_models_active()
+        self._predictions = {}
+        if self.using_ml_models:
+            self._predict_plan({
+                card_model: [target_date, self.next_date],
+                None: self.chart_dates + [target_date],
+            })
+
+    def _predict_plan(self, plan):
+        by_model = {}
+        for model_name, dates in plan.items():
+            by_model.setdefault(aqi_system.resolve_model_name(model_name), set()).update(dates)
+        for model_key, dates in by_model.items():
+            dates = sorted(dates)
+            try:
+                aqis = aqi_system.predict_aqi_for_dates(dates, model_key)
+            except Exception as e:
+                print(f"❌ Dashboard batch prediction failed for {model_key}: {e}")
+                aqis = [None] * len(dates)
+            for date, aqi in zip(dates, aqis):
+                self._predictions[(date.strftime('%Y-%m-%d'), model_key)] = aqi
+
+    def predicted_aqi(self, date, model_name=None):
+        """Model AQI from the batch, or None (simulation mode / failed prediction)."""
+        if not self.using_ml_models:
+            return None
+        key = (date.strftime('%Y-%m-%d'), aqi_system.resolve_model_name(model_name))
+        return self._predictions.get(key)
+
+    def card_aqi(self, date):
+        aqi = self.predicted_aqi(date, self.card_model)
+        if aqi is None:
+            return _simulated_model_aqi(date.strftime('%Y-%m-%d'), MODEL_KEY_MAPPING.get(self.card_model, 'gbr'))
+        return round(float(aqi))
+
+    def chart_aqi(self):
+        chart_data = []
+        for date in self.chart_dates:
+            aqi = self.predicted_aqi(date)
+            chart_data.append(round(aqi) if aqi is not None else _simulated_consistent_aqi(date.strftime('%Y-%m-%d')))
+        if 0 <= self.current_day_position < len(chart_data):
+            current = self.predicted_aqi(self.target_date, 'gradient_boosting')
+            chart_data[self.current_day_position] = (
+                round(current) if current is not None
+                else _simulated_consistent_aqi(self.target_date.strftime('%Y-%m-%d')))
+        return chart_data
+
 @app.route('/api/dashboard', methods=['GET'])
+@http_cached
 def get_dashboard_data():
     try:
         date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
         target_date = datetime.strptime(date_str, '%Y-%m-%d')
-        current_aqi = get_model_specific_aqi(date_str, 'gbr')
+        with STAGE_SECONDS.time(stage='batch_prediction'):
+            context = DashboardContext(target_date)
+        current_aqi = context.card_aqi(target_date)
         try:
-            next_day_date_str = (target_date + timedelta(days=1)).strftime('%Y-%m-%d')
-            next_day_aqi = get_model_specific_aqi(next_day_date_str, 'gbr')
+            next_day_aqi = context.card_aqi(context.next_date)
         except Exception:
             next_day_aqi = 45
 
@@ -276,25 +759,28 @@ def get_dashboard_data():
             model_info = f"Using real ML models: {list(aqi_system.trained_models.keys())}" if models_active else "High-performance simulation system"
 
         if models_trained and aqi_system:
-            main_pollutant = aqi_system.get_main_pollutant_for_date(target_date)
-            concentrations = aqi_system.predict_pollutant_concentrations(target_date)
+            best_model_aqi = context.predicted_aqi(target_date)
+            main_pollutant = aqi_system.get_main_pollutant_for_date(target_date, aqi=best_model_aqi)
+            concentrations = aqi_system.predict_pollutant_concentrations(target_date, aqi=best_model_aqi)
         else:
-            date_seed = int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
-            np.random.seed(date_seed)
+            rng = _np_rng(date_str)
             month = target_date.month
             main_pollutant = 'PM2.5 - Winter Pollution' if month in [11,12,1,2] else ('PM10 Total 0-10um STP' if month in [3,4,5] else ('PM2.5 - Humid Conditions' if month in [6,7,8,9] else 'PM2.5 - Local Conditions'))
             aqi_scale = current_aqi / 50.0
             concentrations = {
-                'PM2.5 - Local Conditions': max(5, 15 * aqi_scale + np.random.normal(0, 6)),
-                'PM10 Total 0-10um STP': max(10, 25 * aqi_scale + np.random.normal(0, 8)),
-                'Ozone': max(0.02, (0.04 + 0.01 * aqi_scale) + np.random.normal(0, 0.015)),
-                'Nitrogen dioxide (NO2)': max(0.01, (0.025 + 0.005 * aqi_scale) + np.random.normal(0, 0.010)),
-                'Carbon monoxide': max(0.3, (1.2 + 0.3 * aqi_scale) + np.random.normal(0, 0.4)),
-                'Sulfur dioxide': max(0.005, (0.015 + 0.005 * aqi_scale) + np.random.normal(0, 0.008))
+                'PM2.5 - Local Conditions': max(5, 15 * aqi_scale + rng.normal(0, 6)),
+                'PM10 Total 0-10um STP': max(10, 25 * aqi_scale + rng.normal(0, 8)),
+                'Ozone': max(0.02, (0.04 + 0.01 * aqi_scale) + rng.normal(0, 0.015)),
+                'Nitrogen dioxide (NO2)': max(0.01, (0.025 + 0.005 * aqi_scale) + rng.normal(0, 0.010)),
+                'Carbon monoxide': max(0.3, (1.2 + 0.3 * aqi_scale) + rng.normal(0, 0.4)),
+                'Sulfur dioxide': max(0.005, (0.015 + 0.005 * aqi_scale) + rng.normal(0, 0.008))
             }
-            np.random.seed(None)
+            if aqi_system is not None:
+                concentrations = aqi_system.breakpoint_engine.scale_concentrations_to_aqi(concentrations, current_aqi)
+                main_pollutant = aqi_system.breakpoint_engine.dominant_concentration(concentrations)
 
-        chart_data = generate_daily_chart_data(target_date)
+        with STAGE_SECONDS.time(stage='chart_generation'):
+            chart_data = context.chart_aqi()
         sensor_data = {
             'pm25': round(concentrations.get('PM2.5 - Local Conditions', 20), 1),
             'o3': round(concentrations.get('Ozone', 0.05) * 1000, 1),
@@ -340,6 +826,11 @@ def get_dashboard_data():
                     'accuracy_percentage': round(perf.get('r2_score', 0) * 100, 1)
                 }
 
+        if _compact_requested():
+            response_data['current_category'] = get_aqi_category_code(current_aqi)
+            response_data['next_day_category'] = get_aqi_category_code(next_day_aqi)
+            response_data['category_legend'] = AQI_CATEGORIES
+
         return jsonify(response_data)
     except Exception as e:
         print(f"❌ Dashboard error: {e}")
@@ -347,6 +838,7 @@ def get_dashboard_data():
 
 # ---------------- Pollutants endpoint ----------------
 @app.route('/api/pollutants', methods=['GET'])
+@http_cached
 def get_pollutants_data():
     try:
         year = int(request.args.get('year', datetime.now().year))
@@ -357,7 +849,8 @@ def get_pollutants_data():
         print(f"🌪️ Pollutants API: y={year} m={month:02d} filter={filter_type} pollutant={pollutant}")
 
         # Chart data (primary) + explicit fallback
-        chart_data = generate_working_chart_data(filter_type, pollutant, year, month)
+        with STAGE_SECONDS.time(stage='chart_generation'):
+            chart_data = generate_working_chart_data(filter_type, pollutant, year, month)
         if not chart_data or not chart_data.get('labels') or not chart_data.get('data'):
             print("Chart gen failed → emergency fallback")
             chart_data = get_emergency_chart_data(filter_type, pollutant=pollutant, year=year, month=month)
@@ -373,24 +866,33 @@ def get_pollutants_data():
         # Month calendar
         calendar_data = []
         _, num_days = monthrange(year, month)
-        for day in range(1, num_days + 1):
-            date_str = f"{year}-{month:02d}-{day:02d}"
-            daily_aqi = get_consistent_aqi_for_date(date_str)
+        calendar_dates = [f"{year}-{month:02d}-{day:02d}" for day in range(1, num_days + 1)]
+        calendar_aqis = get_consistent_aqi_series(calendar_dates)
+        for day, (date_str, daily_aqi) in enumerate(zip(calendar_dates, calendar_aqis), start=1):
             calendar_data.append({
                 'day': day,
                 'aqi': daily_aqi,
                 'category': get_aqi_category(daily_aqi),
-                'main_pollutant': random.choice(['PM2.5', 'PM10', 'NO2', 'O3']),
+                'main_pollutant': _seeded_rng(f"{date_str}|main").choice(['PM2.5', 'PM10', 'NO2', 'O3']),
             })
 
-        return jsonify({
+        response_data = {
             'highest_concentration': normalized_highest,
             'chart_data': chart_data,
             'calendar_data': calendar_data,
             'month_year': f"{month_name} {year}",
             'filter_type': filter_type,
             'selected_pollutant': pollutant
-        })
+        }
+        if _compact_requested():
+            # Columnar calendar (day i is index i-1) with category codes
+            response_data['calendar_data'] = {
+                'aqi': calendar_aqis,
+                'category': [get_aqi_category_code(aqi) for aqi in calendar_aqis],
+                'main_pollutant': [day['main_pollutant'] for day in calendar_data]
+            }
+            response_data['category_legend'] = AQI_CATEGORIES
+        return jsonify(response_data)
 
     except Exception as e:
         print(f"❌ Pollutants API error: {e}")
@@ -401,8 +903,7 @@ def generate_working_chart_data(filter_type, pollutant, year, month):
     """Deterministic values per (pollutant, year, month, filter)."""
     try:
         seed_str = f"{pollutant}-{year:04d}-{month:02d}-{filter_type}"
-        seed = int(hashlib.md5(seed_str.encode()).hexdigest()[:8], 16) % (2**32)
-        np.random.seed(seed); random.seed(seed)
+        rng = _np_rng(seed_str)
 
         ranges = {
             'PM2.5': (20, 65),   # µg/m³
@@ -417,16 +918,16 @@ def generate_working_chart_data(filter_type, pollutant, year, month):
         if filter_type == 'hourly':
             labels = ['00:00','03:00','06:00','09:00','12:00','15:00','18:00','21:00']
             base = np.linspace(low, high, len(labels))
-            noise = np.random.uniform(-0.15, 0.15, len(labels))
+            noise = rng.uniform(-0.15, 0.15, len(labels))
         elif filter_type == 'weekly':
             labels = ['Week 1','Week 2','Week 3','Week 4']
             base = np.linspace(low, high, len(labels))
-            noise = np.random.uniform(-0.12, 0.12, len(labels))
+            noise = rng.uniform(-0.12, 0.12, len(labels))
         else:  # daily
             days_in_month = monthrange(year, month)[1]
             labels = [datetime(year, month, d).strftime('%b %d') for d in range(1, days_in_month + 1)]
             base = np.linspace(low, high, len(labels))
-            noise = np.random.uniform(-0.18, 0.18, len(labels))
+            noise = rng.uniform(-0.18, 0.18, len(labels))
 
         series = base * (1 + noise)
         data = [round(float(x), 1) for x in series]
@@ -634,6 +1135,7 @@ def get_daily_pollutant_series(pollutant, year, month):
 
 # ---------------- Prediction (used by prediction.js) ----------------
 @app.route('/api/prediction', methods=['GET'])
+@http_cached
 def get_prediction():
     try:
         # query params from prediction.js
@@ -655,14 +1157,14 @@ def get_prediction():
         overall_aqi = get_model_specific_aqi(date_str, backend_model)
 
         # 7‑day trend (Today + next 6)
-        trend_labels, trend_values = [], []
+        trend_labels, trend_dates = [], []
         base_date = datetime.strptime(date_str, '%Y-%m-%d')
         for d in range(7):
-            tdate = (base_date + timedelta(days=d)).strftime('%Y-%m-%d')
+            trend_dates.append((base_date + timedelta(days=d)).strftime('%Y-%m-%d'))
             trend_labels.append('Today' if d == 0 else
                                 'Tomorrow' if d == 1 else
                                 (base_date + timedelta(days=d)).strftime('%a %d'))
-            trend_values.append(get_model_specific_aqi(tdate, backend_model))
+        trend_values = get_model_specific_forecast(date_str, len(trend_dates), backend_model)
 
         # model performances for the four models (what your UI renders in the KPI cards)
         def _perf_or_default(k, default):
@@ -703,7 +1205,7 @@ def get_prediction():
             60.3  # static reference
         ]
 
-        return jsonify({
+        response_data = {
             'overall_aqi': int(overall_aqi),
             'aqi_category': get_aqi_category(int(overall_aqi)),
             'trend_data': {
@@ -720,15 +1222,95 @@ def get_prediction():
             'backend_model': backend_model,
             'date': date_str,
             'source': 'REAL_ML' if (models_trained and aqi_system and aqi_system.use_trained_models) else 'SIMULATION'
-        })
+        }
+
+        # models=all: every model's 7-day trend plus the R²-weighted ensemble in this one response
+        if (request.args.get('models') or '').lower() == 'all':
+            all_models = get_all_models_forecast(date_str, len(trend_dates), {
+                key: model_performances[ui_key] for key, ui_key in ui_model_name_by_key.items()})
+            response_data['trend_data_by_model'] = {
+                ui_model_name_by_key[key]: values for key, values in all_models['models'].items()}
+            response_data['ensemble'] = {
+                'trend': all_models['ensemble'],
+                'overall_aqi': all_models['ensemble'][0] if all_models['ensemble'] else None,
+                'weights': {ui_model_name_by_key[key]: round(w, 4) for key, w in all_models['weights'].items()}
+            }
+
+        return jsonify(response_data)
 
     except Exception as e:
         print(f"❌ Prediction API error: {e}")
         return jsonify({'error': f'Failed to get prediction: {str(e)}'}), 500
 
 
+# ---------------- Bulk range ----------------
+RANGE_MAX_DAYS = int(os.environ.get('AQI_RANGE_MAX_DAYS', '3660'))
+RANGE_MODELS = ['gbr', 'rf', 'et', 'xgboost']
+
+@app.route('/api/aqi/range', methods=['GET'])
+@http_cached
+def get_aqi_range():
+    """AQI for every day in [start, end] for one or more models in one call.
+
+    JSON is columnar: one 'dates' array and one values array per model.
+    format=f32 returns the values as little-endian float32, model-major
+    (models x days); X-AQI-Start / X-AQI-Days / X-AQI-Models describe the layout.
+    """
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d')
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d')
+    except KeyError:
+        return jsonify({'error': 'start and end are required (YYYY-MM-DD)'}), 400
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    days = (end - start).days + 1
+    if days < 1:
+        return jsonify({'error': 'end must not be before start'}), 400
+    if days > RANGE_MAX_DAYS:
+        return jsonify({'error': f'range is limited to {RANGE_MAX_DAYS} days'}), 400
+
+    models_param = (request.args.get('models') or 'gbr').lower()
+    models = RANGE_MODELS if models_param == 'all' else [m.strip() for m in models_param.split(',') if m.strip()]
+    unknown = [m for m in models if m not in MODEL_KEY_MAPPING]
+    if not models or unknown:
+        return jsonify({'error': f'unknown models: {unknown}', 'available': RANGE_MODELS}), 400
+    backend_models = list(dict.fromkeys(MODEL_KEY_MAPPING[m] for m in models))
+
+    output_format = (request.args.get('format') or 'json').lower()
+    if output_format not in ('json', 'f32'):
+        return jsonify({'error': 'format must be json or f32'}), 400
+
+    try:
+        date_strs = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days)]
+        values = {model: get_model_specific_aqi_series(date_strs, model) for model in backend_models}
+        source = 'REAL_ML' if _ml_models_active() else 'SIMULATION'
+
+        if output_format == 'f32':
+            body = np.asarray([values[m] for m in backend_models], dtype='<f4').tobytes()
+            return Response(body, mimetype='application/octet-stream', headers={
+                'X-AQI-Start': date_strs[0],
+                'X-AQI-Days': str(days),
+                'X-AQI-Models': ','.join(backend_models),
+                'X-AQI-Source': source,
+                'Access-Control-Expose-Headers': 'X-AQI-Start, X-AQI-Days, X-AQI-Models, X-AQI-Source'
+            })
+
+        return jsonify({
+            'start': date_strs[0],
+            'end': date_strs[-1],
+            'days': days,
+            'dates': date_strs,
+            'models': values,
+            'source': source
+        })
+    except Exception as e:
+        print(f"❌ Range API error: {e}")
+        return jsonify({'error': f'Failed to get AQI range: {str(e)}'}), 500
+
+
 # ---------------- Recommendations + category ----------------
 @app.route('/api/recommendations', methods=['GET'])
+@http_cached
 def get_recommendations():
     try:
         date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
@@ -752,13 +1334,22 @@ def get_recommendations():
     except Exception as e:
         return jsonify({'error': f'Failed to get recommendations: {str(e)}'}), 500
 
+AQI_CATEGORIES = ['Good', 'Moderate', 'Unhealthy for Sensitive Groups', 'Unhealthy', 'Very Unhealthy', 'Hazardous']
+
+def get_aqi_category_code(aqi):
+    """Index into AQI_CATEGORIES (the compact response shape sends this instead of the name)."""
+    if aqi <= 50: return 0
+    if aqi <= 100: return 1
+    if aqi <= 150: return 2
+    if aqi <= 200: return 3
+    if aqi <= 300: return 4
+    return 5
+
 def get_aqi_category(aqi):
-    if aqi <= 50: return 'Good'
-    if aqi <= 100: return 'Moderate'
-    if aqi <= 150: return 'Unhealthy for Sensitive Groups'
-    if aqi <= 200: return 'Unhealthy'
-    if aqi <= 300: return 'Very Unhealthy'
-    return 'Hazardous'
+    return AQI_CATEGORIES[get_aqi_category_code(aqi)]
+
+def _compact_requested():
+    return request.args.get('compact', '').lower() in ('1', 'true', 'yes')
 
 # ---------------- Main ----------------
 if __name__ == '__main__':
@@ -769,5 +1360,9 @@ if __name__ == '__main__':
     print("  GET  /api/prediction")
     print("  GET  /api/pollutants")
     print("  GET  /api/recommendations")
+    print("  GET  /api/aqi/range")
+    print("  GET  /api/metrics")
+    print("  POST /api/admin/reload-models")
+    print("  POST /api/admin/observed-aqi")
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,66 @@
+"""
+Production gunicorn settings for the AirSight API.
+
+    gunicorn -c gunicorn.conf.py
+
+The app (and therefore aqi_4_models) is imported once in the master with
+preload_app, then workers fork and share the model memory copy-on-write
+instead of each unpickling its own copy. Tune with WEB_CONCURRENCY,
+GUNICORN_THREADS, PORT and GUNICORN_TIMEOUT.
+
+AQI_SERVER_MODE=asgi serves asgi_app:app with uvicorn workers instead:
+prediction requests and static files run on each worker's AQI_ASGI_THREADS
+executor; only /api/health and /api/metrics stay on the event loop.
+"""
+
+import gc
+import multiprocessing
+import os
+
+server_mode = os.environ.get('AQI_SERVER_MODE', 'wsgi').lower()
+wsgi_app = 'asgi_app:app' if server_mode == 'asgi' else 'flask_api_backend:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Load models before fork so every worker shares them
+preload_app = True
+
+# Prediction is CPU-bound: one process per core, a few threads each for I/O
+# overlap (the prediction system is thread-safe)
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count())))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+if server_mode == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '600'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Runs in the master after the preloaded app is imported, before any fork."""
+    import flask_api_backend
+
+    aqi_system = flask_api_backend.aqi_system
+    if aqi_system is not None and aqi_system.trained_models_loaded:
+        # Pull lazily-loaded models in now so workers inherit them
+        aqi_system.load_all_models()
+    # Keep the preloaded objects out of the cyclic GC so collections in the
+    # workers don't touch (and un-share) their pages
+    gc.freeze()
+    server.log.info("Models preloaded in master (pid %s); forking %s %s workers",
+                    os.getpid(), workers, worker_class)
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after fork: start its prediction pool (AQI_PREDICTION_PROCESSES)."""
+    import flask_api_backend
+
+    aqi_system = flask_api_backend.aqi_system
+    if aqi_system is not None and aqi_system.warm_prediction_pool():
+        server.log.info("Worker %s: warming %s prediction pool processes",
+                        worker.pid, aqi_system.prediction_pool.processes)
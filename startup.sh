@@ -1,5 +1,9 @@
 #!/bin/bash
-echo "Starting AQI Prediction System initialization..."
-python aqi_prediction_system.py
+# Models are loaded once in the gunicorn master (preload_app) and shared by
+# the workers; set AQI_STARTUP_SELFTEST=1 to also run the standalone check.
+if [ "${AQI_STARTUP_SELFTEST:-0}" = "1" ]; then
+    echo "Running AQI Prediction System self-test..."
+    python aqi_prediction_system.py
+fi
 echo "Starting Flask backend server..."
-gunicorn --bind=0.0.0.0 --timeout 600 flask_api_backend:app
+exec gunicorn -c gunicorn.conf.py